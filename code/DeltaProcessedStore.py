@@ -0,0 +1,127 @@
+# Import the required libraries
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+class DeltaProcessedStore:
+
+    def __init__(self, store_file):
+        self.store_file = store_file
+        self.store_version = None
+        # Fingerprint of the raw rows of each client (indexed on 'ClientID'), as of the last run
+        self.client_fingerprints = pd.Series(dtype=np.uint64)
+        # Processed rows of the last run, indexed on 'ClientID'
+        self.processed_data = None
+
+    def get_file_content_hash(self, file_name):
+        """
+        Public: Method to compute the hash of the content of a file (e.g. the source of the module processing the data).
+        :param file_name: Name of the file.
+        :return The hex digest of the SHA-256 hash of the file content.
+        """
+        with open(file_name, 'rb') as input_file:
+            return hashlib.sha256(input_file.read()).hexdigest()
+
+    def get_store_version(self, *version_parts):
+        """
+        Public: Method to compute the version of the store from everything the processed rows depend on besides the
+        raw rows of each client (e.g. the config values, the source of the processing module and the reference data).
+        :param version_parts: The parts the processed rows depend on (their repr() is hashed).
+        :return The hex digest of the SHA-256 hash of the version parts.
+        """
+        return hashlib.sha256(repr(version_parts).encode('utf-8')).hexdigest()
+
+    def load(self, store_version):
+        """
+        Public: Method to load the fingerprints and processed rows of the last run. They are only reused when the store
+        was written with the same version, otherwise the store starts empty (and every client is processed).
+        :param store_version: The version of the store expected.
+        :return A boolean flag indicating whether the stored rows were loaded or not.
+        """
+        self.store_version = store_version
+        self.client_fingerprints = pd.Series(dtype=np.uint64)
+        self.processed_data = None
+        if not os.path.exists(self.store_file):
+            return False
+        store_content = pd.read_pickle(self.store_file)
+        if store_content["StoreVersion"] != store_version:
+            return False
+        self.client_fingerprints = store_content["ClientFingerprints"]
+        self.processed_data = store_content["ProcessedData"]
+        return True
+
+    def get_client_fingerprints(self, data_frame_list):
+        """
+        Public: Method to fingerprint the raw rows of each client across all the data files. Each row is hashed along
+        with the number of its file and its occurrence number within the client (so that a client moved between files,
+        or with reordered duplicate rows, gets a new fingerprint), and the row hashes of a client are summed up. The
+        values are hashed along with the dtypes of their columns: the cleaned values can depend on the dtype a column
+        is read with (e.g. the Client IDs read as floats), so every client of a file is processed again when it changes.
+        :param data_frame_list: A list containing the pandas dataframe objects loaded from the CSV files.
+        :return A pandas series object containing the fingerprint of each client, indexed on 'ClientID'.
+        """
+        row_hash_list = []
+        for file_no, df_data in enumerate(data_frame_list):
+            if df_data['ClientID'].is_unique:
+                occurrence_nos = np.zeros(len(df_data), dtype=np.int64)
+            else:
+                occurrence_nos = df_data.groupby('ClientID', sort=False).cumcount().to_numpy()
+            row_key_hashes = pd.util.hash_array(occurrence_nos * len(data_frame_list) + file_no)
+            row_hashes = pd.util.hash_array(pd.util.hash_pandas_object(df_data, index=False).to_numpy() ^
+                                            row_key_hashes)
+            row_hash_list.append(pd.Series(row_hashes, index=df_data['ClientID'].values))
+        # The sum of the unsigned 64-bit hashes wraps around, which keeps every bit of each row hash.
+        return pd.concat(row_hash_list).groupby(level=0, sort=False).sum()
+
+    def find_changed_clients(self, client_fingerprints):
+        """
+        Public: Method to compare the fingerprints of the clients with those of the last run.
+        :param client_fingerprints: A pandas series object containing the fingerprint of each client.
+        :return A tuple containing the pandas index objects of the inserted, updated and deleted Client IDs.
+        """
+        stored_fingerprints = self.client_fingerprints
+        inserted_client_ids = client_fingerprints.index.difference(stored_fingerprints.index)
+        deleted_client_ids = stored_fingerprints.index.difference(client_fingerprints.index)
+        common_client_ids = client_fingerprints.index.intersection(stored_fingerprints.index)
+        updated_client_ids = common_client_ids[client_fingerprints.loc[common_client_ids].values !=
+                                               stored_fingerprints.loc[common_client_ids].values]
+        return inserted_client_ids, updated_client_ids, deleted_client_ids
+
+    def upsert(self, df_changed_data, stale_client_ids, client_order_ids):
+        """
+        Public: Method to replace the stored rows of the stale (updated or deleted) clients with the rows processed
+        for the changed clients, and order the rows as a full run would (the order of the clients in the demographic
+        data, keeping the rows of a client together).
+        :param df_changed_data: A pandas dataframe object containing the processed rows of the changed clients (or
+        None when there are none).
+        :param stale_client_ids: The Client IDs whose stored rows are replaced or removed.
+        :param client_order_ids: A numpy array containing the Client IDs in the order of the demographic data.
+        :return A pandas dataframe object containing the processed rows of every client.
+        """
+        data_frame_list = []
+        if self.processed_data is not None:
+            data_frame_list.append(self.processed_data[~self.processed_data.index.isin(stale_client_ids)])
+        if df_changed_data is not None:
+            data_frame_list.append(df_changed_data.set_axis(df_changed_data['ClientID'].values))
+        if not data_frame_list:
+            return pd.DataFrame()
+        df_processed_data = pd.concat(data_frame_list)
+
+        client_positions = pd.Index(pd.unique(client_order_ids)).get_indexer(df_processed_data.index)
+        self.processed_data = df_processed_data.iloc[np.argsort(client_positions, kind='stable')]
+        return self.processed_data.reset_index(drop=True)
+
+    def save(self, client_fingerprints):
+        """
+        Public: Method to write the fingerprints and the processed rows into the store file, for the next run.
+        :param client_fingerprints: A pandas series object containing the fingerprint of each client.
+        """
+        os.makedirs(os.path.dirname(self.store_file), exist_ok=True)
+        self.client_fingerprints = client_fingerprints
+        # Write to a temporary file first, so that an interrupted write never leaves a partial store file behind.
+        pd.to_pickle({"StoreVersion": self.store_version,
+                      "ClientFingerprints": client_fingerprints,
+                      "ProcessedData": self.processed_data}, self.store_file + ".tmp")
+        os.replace(self.store_file + ".tmp", self.store_file)
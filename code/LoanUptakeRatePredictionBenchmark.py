@@ -0,0 +1,230 @@
+# Import the required libraries
+import os
+import json
+import time
+import platform
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+import config as cfg
+from LoanUptakeRatePredictionDataProcessor import LoanUptakeRatePredictionDataProcessor
+from SyntheticLoanDataGenerator import SyntheticLoanDataGenerator
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+
+class LoanUptakeRatePredictionBenchmark:
+
+    def __init__(self):
+        self.benchmark_data_dir = cfg.BENCHMARK_DATA_DIR
+        self.client_count_list = cfg.BENCHMARK_CLIENT_COUNTS
+        self.benchmark_results_file = cfg.BENCHMARK_RESULTS_FILE
+        self.benchmark_baseline_file = cfg.BENCHMARK_BASELINE_FILE
+        self.regression_tolerance = cfg.BENCHMARK_REGRESSION_TOLERANCE
+        self.min_regression_seconds = cfg.BENCHMARK_MIN_REGRESSION_SECONDS
+        self.wall_time_repeats = cfg.BENCHMARK_WALL_TIME_REPEATS
+        self.update_baseline = cfg.BENCHMARK_UPDATE_BASELINE
+
+    def prepare_benchmark_data(self, no_of_clients):
+        """
+        Public: Method to generate the synthetic raw data files for the number of clients, unless they were generated
+        by an earlier run with the same seed and dirty value rate (the same settings always generate the same files).
+        A marker file holding the settings is written once all the files are generated, so that the files of an
+        interrupted run are generated again.
+        :param no_of_clients: The number of clients in the training data.
+        :return A list containing the names of the raw training data files.
+        """
+        data_generator = SyntheticLoanDataGenerator(no_of_clients)
+        output_dir = os.path.join(self.benchmark_data_dir, "{}_clients".format(no_of_clients))
+        generation_marker_file = os.path.join(output_dir, "Generated.json")
+        generation_settings = {"RandomSeed": data_generator.random_seed,
+                               "DirtyValueRate": data_generator.dirty_value_rate}
+        if os.path.exists(generation_marker_file):
+            with open(generation_marker_file) as input_file:
+                if json.load(input_file) == generation_settings:
+                    return data_generator.get_raw_data_file_lists(output_dir)[0]
+            os.remove(generation_marker_file)
+
+        raw_training_data_file_list, _ = data_generator.write_raw_data_files(output_dir)
+        with open(generation_marker_file, 'w') as output_file:
+            json.dump(generation_settings, output_file)
+        return raw_training_data_file_list
+
+    def measure_wall_time(self, stage_method, stage_input):
+        """
+        Public: Method to run a stage and measure its wall time.
+        :param stage_method: The method running the stage.
+        :param stage_input: The input of the stage (the result of the previous stage).
+        :return A tuple containing the result of the stage and its wall time in seconds.
+        """
+        stage_start_time = time.perf_counter()
+        stage_result = stage_method(stage_input)
+        return stage_result, time.perf_counter() - stage_start_time
+
+    def measure_peak_memory(self, stage_method, stage_input):
+        """
+        Public: Method to run a stage and measure the peak memory it allocates, traced with tracemalloc (which sees the
+        allocations of python, numpy and pandas). Tracing slows the stages down unevenly, so it is never done while
+        the wall time is measured.
+        :param stage_method: The method running the stage.
+        :param stage_input: The input of the stage (the result of the previous stage).
+        :return A tuple containing the result of the stage and its peak memory in bytes.
+        """
+        tracemalloc.start()
+        stage_result = stage_method(stage_input)
+        stage_peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return stage_result, stage_peak_memory
+
+    def run_pipeline_stages(self, raw_training_data_file_list, measure_stage):
+        """
+        Public: Method to run the stages of the pipeline (loading the files, merging them and each cleaning stage) one
+        after another on the training data, and measure each of them. The reference data is loaded beforehand, so that
+        it isn't measured as part of the first stage using it.
+        :param raw_training_data_file_list: A list containing the names of the raw training data files.
+        :param measure_stage: The method running and measuring a stage.
+        :return A list of (stage name, number of rows, measurement) tuples.
+        """
+        data_processor = LoanUptakeRatePredictionDataProcessor()
+        data_processor.print_reports = False
+        data_processor.load_county_lookup_index()
+        data_processor.reference_data_registry.get_merchant_category_lookup(data_processor.ext_merchant_category_file)
+
+        stage_name_list = ['prepare_combined_data_frame_list', 'combine_all_dataframes'] + \
+            data_processor.cleaning_stage_list
+        stage_measurement_list = []
+        stage_result = raw_training_data_file_list
+        for stage_name in stage_name_list:
+            stage_result, stage_measurement = measure_stage(getattr(data_processor, stage_name), stage_result)
+            # The loading stage returns one dataframe object per file, whose size is given by the demographic data.
+            no_of_rows = len(stage_result[0]) if isinstance(stage_result, list) else len(stage_result)
+            stage_measurement_list.append((stage_name, no_of_rows, stage_measurement))
+        return stage_measurement_list
+
+    def run_pipeline_benchmark(self, raw_training_data_file_list):
+        """
+        Public: Method to measure the wall time, throughput and peak memory of each stage of the pipeline. The wall
+        times and the peak memory are measured in separate runs. A single wall time can be thrown off by the rest of
+        the machine, so the pipeline is run 'wall_time_repeats' times (the cleaning stages change their input, so a
+        stage can't be repeated on its own) and the median wall time of each stage is kept.
+        :param raw_training_data_file_list: A list containing the names of the raw training data files.
+        :return A dictionary object mapping the name of each stage (and 'total') to its measurements.
+        """
+        repeated_wall_time_lists = [self.run_pipeline_stages(raw_training_data_file_list, self.measure_wall_time)
+                                    for _ in range(self.wall_time_repeats)]
+        wall_time_list = []
+        for stage_no, (stage_name, no_of_rows, _) in enumerate(repeated_wall_time_lists[0]):
+            stage_wall_times = [repeated_wall_time_list[stage_no][2]
+                                for repeated_wall_time_list in repeated_wall_time_lists]
+            wall_time_list.append((stage_name, no_of_rows, float(np.median(stage_wall_times))))
+        peak_memory_list = self.run_pipeline_stages(raw_training_data_file_list, self.measure_peak_memory)
+
+        stage_measurement_dict = {}
+        for (stage_name, no_of_rows, stage_wall_time), (_, _, stage_peak_memory) in zip(wall_time_list,
+                                                                                       peak_memory_list):
+            stage_measurement_dict[stage_name] = {"Rows": no_of_rows,
+                                                  "WallTimeSeconds": round(stage_wall_time, 6),
+                                                  "RowsPerSecond": round(no_of_rows / stage_wall_time, 1),
+                                                  "PeakMemoryBytes": stage_peak_memory}
+
+        no_of_rows = wall_time_list[-1][1]
+        total_wall_time = sum(stage_wall_time for _, _, stage_wall_time in wall_time_list)
+        stage_measurement_dict["total"] = {"Rows": no_of_rows,
+                                           "WallTimeSeconds": round(total_wall_time, 6),
+                                           "RowsPerSecond": round(no_of_rows / total_wall_time, 1),
+                                           "PeakMemoryBytes": max(stage_peak_memory
+                                                                  for _, _, stage_peak_memory in peak_memory_list)}
+        return stage_measurement_dict
+
+    def compare_with_baseline(self, benchmark_results, baseline_results):
+        """
+        Public: Method to compare the measurements of each stage with the stored baseline. A stage regressed when it
+        took more than 'regression_tolerance' (and 'min_regression_seconds') longer, or its peak memory grew by more
+        than 'regression_tolerance'.
+        :param benchmark_results: A dictionary object mapping each number of clients to the stage measurements.
+        :param baseline_results: A dictionary object holding the baseline measurements, in the same layout.
+        :return A pandas dataframe object containing the comparison of each stage found in both.
+        """
+        comparison_row_list = []
+        for no_of_clients, stage_measurement_dict in benchmark_results.items():
+            for stage_name, stage_measurement in stage_measurement_dict.items():
+                baseline_measurement = baseline_results.get(no_of_clients, {}).get(stage_name)
+                if baseline_measurement is None:
+                    continue
+                wall_time_ratio = stage_measurement["WallTimeSeconds"] / max(baseline_measurement["WallTimeSeconds"],
+                                                                             1e-9)
+                peak_memory_ratio = stage_measurement["PeakMemoryBytes"] / max(baseline_measurement["PeakMemoryBytes"],
+                                                                               1)
+                wall_time_regression = (wall_time_ratio > 1 + self.regression_tolerance and
+                                        stage_measurement["WallTimeSeconds"] - baseline_measurement["WallTimeSeconds"]
+                                        > self.min_regression_seconds)
+                comparison_row_list.append({"Clients": no_of_clients,
+                                            "Stage": stage_name,
+                                            "WallTimeSeconds": stage_measurement["WallTimeSeconds"],
+                                            "BaselineWallTimeSeconds": baseline_measurement["WallTimeSeconds"],
+                                            "WallTimeRatio": round(wall_time_ratio, 3),
+                                            "PeakMemoryRatio": round(peak_memory_ratio, 3),
+                                            "Regression": wall_time_regression or
+                                            peak_memory_ratio > 1 + self.regression_tolerance})
+        return pd.DataFrame(comparison_row_list)
+
+    def get_results_report(self, benchmark_results):
+        """
+        Public: Method to tabulate the measurements of each stage for each number of clients.
+        :param benchmark_results: A dictionary object mapping each number of clients to the stage measurements.
+        :return A pandas dataframe object containing the measurements, with the peak memory in MiB.
+        """
+        df_results_report = pd.DataFrame([dict(stage_measurement, Clients=no_of_clients, Stage=stage_name)
+                                          for no_of_clients, stage_measurement_dict in benchmark_results.items()
+                                          for stage_name, stage_measurement in stage_measurement_dict.items()])
+        df_results_report["PeakMemoryMiB"] = np.round(df_results_report.pop("PeakMemoryBytes") / 1024 ** 2, 1)
+        return df_results_report[["Clients", "Stage", "Rows", "WallTimeSeconds", "RowsPerSecond", "PeakMemoryMiB"]]
+
+    def write_results_file(self, benchmark_results, results_file):
+        """
+        Public: Method to write the measurements into a JSON file, along with the versions of the environment they
+        were taken in.
+        :param benchmark_results: A dictionary object mapping each number of clients to the stage measurements.
+        :param results_file: Name of the JSON file.
+        """
+        os.makedirs(os.path.dirname(results_file), exist_ok=True)
+        with open(results_file, 'w') as output_file:
+            json.dump({"Environment": {"Machine": platform.platform(), "Python": platform.python_version(),
+                                       "pandas": pd.__version__, "numpy": np.__version__},
+                       "Results": benchmark_results}, output_file, indent=2)
+
+    def execution_package(self):
+        """
+        Public: Method to run the benchmark for each number of clients in 'client_count_list', write the results file
+        and compare the results with the stored baseline. The results are stored as the baseline when there is no
+        baseline yet, or when 'update_baseline' is set.
+        :return A boolean flag indicating whether the benchmark ran without any regression or not.
+        """
+        benchmark_results = {}
+        for no_of_clients in self.client_count_list:
+            raw_training_data_file_list = self.prepare_benchmark_data(no_of_clients)
+            benchmark_results[str(no_of_clients)] = self.run_pipeline_benchmark(raw_training_data_file_list)
+        self.write_results_file(benchmark_results, self.benchmark_results_file)
+        print(self.get_results_report(benchmark_results).to_string(index=False))
+
+        if self.update_baseline or not os.path.exists(self.benchmark_baseline_file):
+            self.write_results_file(benchmark_results, self.benchmark_baseline_file)
+            print("Stored the results as the baseline.")
+            return True
+
+        with open(self.benchmark_baseline_file) as input_file:
+            baseline_results = json.load(input_file)["Results"]
+        df_comparison = self.compare_with_baseline(benchmark_results, baseline_results)
+        if len(df_comparison):
+            print(df_comparison.to_string(index=False))
+        return not (len(df_comparison) and df_comparison["Regression"].any())
+
+
+if __name__ == "__main__":
+    obj_benchmark = LoanUptakeRatePredictionBenchmark()
+    success_flag = obj_benchmark.execution_package()
+    if success_flag:
+        print("No regression against the baseline.")
+    else:
+        print("Regressions found against the baseline.")
@@ -1,9 +1,19 @@
 # Import the required libraries
+import os
+import re
+import math
+import pickle
+import tempfile
 import warnings
 import pandas as pd
 import numpy as np
 import config as cfg
-from functools import reduce
+from StageResultCache import StageResultCache
+from StageInstrumentation import StageInstrumentation
+from DeltaProcessedStore import DeltaProcessedStore
+from ReferenceDataRegistry import get_reference_data_registry
+from functools import reduce, lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pandas.api.types import CategoricalDtype
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -24,27 +34,128 @@ class LoanUptakeRatePredictionDataProcessor:
         self.category_var_col_list = cfg.CATEGORY_VAR_COL_LIST
         self.pro_training_data_file = cfg.PRO_TRA_DATA_FILE_NAME
         self.pro_test_data_file = cfg.PRO_TEST_DATA_FILE_NAME
+        self.raw_demographic_data_col_dict = cfg.RAW_DEMOGRAPHIC_DATA_COL_DICT
+        self.raw_prev_loan_data_col_dict = cfg.RAW_PREVIOUS_LOAN_DATA_COL_DICT
+        self.raw_prods_held_data_col_dict = cfg.RAW_PRODUCTS_HELD_DATA_COL_DICT
+        self.raw_avg_txn_amt_data_col_dict = cfg.RAW_AVG_TXN_AMOUNT_DATA_COL_DICT
+        self.raw_txn_details_data_col_dict = cfg.RAW_TXN_DETAILS_DATA_COL_DICT
+        self.raw_loan_flag_data_col_dict = cfg.RAW_TARGET_VARIABLE_DATA_COL_DICT
+        # Columns of each raw data file, in the order of the raw data file lists
+        self.raw_data_col_dict_list = [self.raw_demographic_data_col_dict, self.raw_prev_loan_data_col_dict,
+                                       self.raw_prods_held_data_col_dict, self.raw_avg_txn_amt_data_col_dict,
+                                       self.raw_txn_details_data_col_dict, self.raw_loan_flag_data_col_dict]
+        # Processed name of each raw column of the records scored online (every file other than the loan flag one)
+        self.raw_record_col_dict = {}
+        for raw_data_col_dict in self.raw_data_col_dict_list[:5]:
+            self.raw_record_col_dict.update(raw_data_col_dict)
+        self.raw_data_col_dtype_dict = cfg.RAW_DATA_COL_DTYPE_DICT
+        self.compact_raw_category_col_list = cfg.COMPACT_RAW_CATEGORY_COL_LIST
+        self.streaming_chunk_size = cfg.STREAMING_CHUNK_SIZE
+        self.streaming_spill_dir = cfg.STREAMING_SPILL_DIR
+        self.sorted_join_fast_path = cfg.SORTED_JOIN_FAST_PATH
+        self.processed_data_formats = cfg.PROCESSED_DATA_FORMATS
+        self.compact_dtypes = cfg.COMPACT_DTYPES
+        self.ingestion_workers = cfg.INGESTION_WORKERS
+        self.ingestion_pool_type = cfg.INGESTION_POOL_TYPE
+        self.cleaning_workers = cfg.CLEANING_WORKERS
+        self.cleaning_shard_min_rows = cfg.CLEANING_SHARD_MIN_ROWS
+        self.county_resolver_cache_size = cfg.COUNTY_RESOLVER_CACHE_SIZE
+        self.income_category_values = ['Low', 'Lower Middle', 'Upper', 'Upper Middle', 'High']
+        # Zero decimals of a whole number written as a float (e.g. the '.0' of '36.0')
+        self.whole_number_suffix_pattern = '\\.0+$'
+        self.cleaning_stage_list = ['clean_age_values', 'clean_gender_values', 'clean_income_category_values',
+                                    'clean_county_values', 'clean_loan_held_before_values', 'clean_prods_held_values',
+                                    'clean_avg_txt_amt_values', 'clean_txn_details_values', 'restore_valid_col_dtypes']
+        # External data files read by each stage (their content hashes are part of the stage cache keys)
+        self.stage_reference_file_dict = {'clean_county_values': [self.ext_county_town_file],
+                                          'clean_txn_details_values': [self.ext_merchant_category_file],
+                                          'restore_valid_col_dtypes': [self.ext_county_town_file,
+                                                                       self.ext_merchant_category_file]}
+        self.stage_result_cache = None
+        if cfg.STAGE_CACHE_ENABLED:
+            self.stage_result_cache = StageResultCache(cfg.STAGE_CACHE_DIR, cfg.STAGE_CACHE_MAX_SIZE_BYTES,
+                                                       cfg.STAGE_CACHE_FORCE_REBUILD)
+        self.delta_processing = cfg.DELTA_PROCESSING_ENABLED
+        self.delta_training_store_file = cfg.DELTA_TRAINING_STORE_FILE
+        self.delta_testing_store_file = cfg.DELTA_TESTING_STORE_FILE
+        self.run_report_file = cfg.RUN_REPORT_FILE
+        self.stage_instrumentation = None
+        if cfg.RUN_REPORT_ENABLED:
+            self.stage_instrumentation = StageInstrumentation(cfg.RUN_REPORT_PROFILED_STAGE)
+        self.reference_data_registry = get_reference_data_registry(self.encoding_format)
+        self.county_lookup_index = None
+        # Print the data quality and memory reports while processing the data
+        self.print_reports = True
+        self.avg_txn_amt_quality_stats = None
+        # Rows of each source file (keyed by file name) joined and dropped by the merges of the run
+        self.join_drop_report = {}
+        self.delta_change_report = None
+        self.category_dtype_plan = None
+        # Memoize the county resolution of each distinct raw value, bounded to the configured number of entries.
+        self.resolve_county_value = lru_cache(maxsize=self.county_resolver_cache_size)(self.resolve_county_value)
+
+    def __getstate__(self):
+        # The memoized county resolver can't be pickled (e.g. when sent to a worker process), so it is left out and
+        # rebuilt with an empty cache when the object is unpickled.
+        # The county lookup is left out as well, as every process gets it from its own reference data registry.
+        # The stages run in another process aren't instrumented (the run report is kept by this process).
+        state = self.__dict__.copy()
+        del state['resolve_county_value']
+        state['county_lookup_index'] = None
+        state['stage_instrumentation'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.resolve_county_value = lru_cache(maxsize=self.county_resolver_cache_size)(self.resolve_county_value)
+
+    def run_stage(self, stage_name, stage_method, *stage_args):
+        """
+        Public: Method to run a stage of the pipeline, recording it in the run report when the instrumentation is
+        enabled (otherwise the stage method is simply called).
+        :param stage_name: Name of the stage.
+        :param stage_method: The method running the stage.
+        :param stage_args: The arguments of the stage method.
+        :return The result of the stage.
+        """
+        if self.stage_instrumentation is None:
+            return stage_method(*stage_args)
+        return self.stage_instrumentation.run_stage(stage_name, stage_method, *stage_args)
+
+    def set_instrumented_data_set(self, data_set_name):
+        """
+        Public: Method to set the data set (e.g. 'training' or 'testing') the stages run next are recorded against.
+        :param data_set_name: Name of the data set.
+        """
+        if self.stage_instrumentation is not None:
+            self.stage_instrumentation.data_set_name = data_set_name
 
     def load_data_to_df(self, data_file_name):
         """
-        Public: Method to read the CSV file and load the data into a pandas dataframe.
+        Public: Method to read the CSV file and load the data into a pandas dataframe. The columns are read with the
+        fixed types of get_raw_data_col_dtype_dict() (e.g. the dirty columns as strings).
         :param data_file_name: Name of the CSV file which contains the data.
         :return: A pandas dataframe object
         """
-        input_data = pd.read_csv(data_file_name, encoding=self.encoding_format)
+        input_data = pd.read_csv(data_file_name, encoding=self.encoding_format,
+                                 dtype=self.get_raw_data_col_dtype_dict())
         return input_data
 
-    def load_external_data_dict(self, external_data_file_name):
+    def get_raw_data_col_dtype_dict(self):
         """
-        Public: Method to read the CSV file containing the external data to support data cleaning, into a python
-        dictionary object.
-        :param external_data_file_name: Name of the CSV file containing the data
-        :return: A dictionary object
+        Public: Method to get the types the raw columns are read with: those of 'raw_data_col_dtype_dict', except that
+        with the compact dtypes the text columns with few distinct values ('compact_raw_category_col_list') are read
+        as pandas categoricals, which the cleaning rules then clean through their categories (see clean_col_values).
+        :return A dictionary object mapping the raw column names to their types.
         """
-        df_external_data = self.load_data_to_df(external_data_file_name)
-        external_data_dict = dict(zip(df_external_data[df_external_data.columns[0]],
-                                      df_external_data[df_external_data.columns[1]]))
-        return external_data_dict
+        if not self.compact_dtypes:
+            return self.raw_data_col_dtype_dict
+        raw_data_col_dtype_dict = dict(self.raw_data_col_dtype_dict)
+        for raw_data_col_dict in self.raw_data_col_dict_list:
+            for raw_col, col in raw_data_col_dict.items():
+                if col in self.compact_raw_category_col_list:
+                    raw_data_col_dtype_dict[raw_col] = 'category'
+        return raw_data_col_dtype_dict
 
     def prepare_demographic_data(self, demographic_data_file):
         """
@@ -55,16 +166,37 @@ class LoanUptakeRatePredictionDataProcessor:
         data.
         """
         df_demographics_data = self.load_data_to_df(demographic_data_file)
-        dict_demographic_data_cols = {"Client ID": "ClientID",
-                                      "Age": "Age",
-                                      "Gender \n1: Female, 2: Male": "Gender",
-                                      "County": "County",
-                                      "Income Group": "IncomeGroup"}
-        df_demographics_data = df_demographics_data.rename(columns=dict_demographic_data_cols)
-        # Drop any row in the data frame that contains a duplicate value of Client ID.
-        df_demographics_data.drop_duplicates("ClientID", inplace=True)
+        df_demographics_data = self.format_demographic_data(df_demographics_data)
         return df_demographics_data
 
+    def format_demographic_data(self, df_demographics_data):
+        """
+        Public: Method to perform the first level of pre-processing (renaming of columns and drop duplicate rows) on
+        the demographic data (either the whole file or a chunk of it).
+        :param df_demographics_data: A pandas dataframe object containing the raw demographic data.
+        :return df_demographics_data: A pandas dataframe object containing the pre-processed version of the demographic
+        data.
+        """
+        return self.format_raw_data(df_demographics_data, self.raw_demographic_data_col_dict)
+
+    def format_raw_data(self, df_raw_data, raw_data_col_dict):
+        """
+        Public: Method to perform the first level of pre-processing on the data of any raw data file (either the whole
+        file or a chunk of it): renaming of columns, dropping the rows without a Client ID (they can't be joined) and
+        dropping duplicate rows. A blank Client ID makes pandas read all the Client IDs of the file as floats, so the
+        whole-number IDs are turned back into integers, to be joined to (and written like) the IDs of the other files.
+        :param df_raw_data: A pandas dataframe object containing the raw data.
+        :param raw_data_col_dict: A dictionary object mapping the raw column names to the renamed ones.
+        :return A pandas dataframe object containing the pre-processed version of the data.
+        """
+        df_data = df_raw_data.rename(columns=raw_data_col_dict)
+        if df_data['ClientID'].isna().any():
+            df_data = df_data[df_data['ClientID'].notna()]
+            if pd.api.types.is_float_dtype(df_data['ClientID']) and (df_data['ClientID'] % 1 == 0).all():
+                df_data = df_data.assign(ClientID=df_data['ClientID'].astype(np.int64))
+        # Drop any row in the data frame that contains a duplicate value of Client ID.
+        return df_data.drop_duplicates("ClientID")
+
     def prepare_previous_loan_data(self, prev_loan_data_file):
         """
         Public: Method to load the previously loan held data into a pandas dataframe object and then perform the first
@@ -73,11 +205,7 @@ class LoanUptakeRatePredictionDataProcessor:
         :return A pandas dataframe containing the pre-processed previous loan held data.
         """
         df_prev_loan_data = self.load_data_to_df(prev_loan_data_file)
-        dict_prev_loan_data_cols = {"Client ID": "ClientID",
-                                    "Held Loan previously": "LoanHeldBefore"}
-        df_prev_loan_data = df_prev_loan_data.rename(columns=dict_prev_loan_data_cols)
-        # Drop any row in the data frame that contains a duplicate value of Client ID.
-        df_prev_loan_data.drop_duplicates("ClientID", inplace=True)
+        df_prev_loan_data = self.format_raw_data(df_prev_loan_data, self.raw_prev_loan_data_col_dict)
         return df_prev_loan_data
 
     def prepare_prods_held_data(self, prods_held_data_file):
@@ -88,11 +216,7 @@ class LoanUptakeRatePredictionDataProcessor:
         :return A pandas dataframe containing the pre-processed number of products held data.
         """
         df_prods_held_data = self.load_data_to_df(prods_held_data_file)
-        dict_prods_held_data_cols = {"Client ID": "ClientID",
-                                     "# Products in bank": "NoOfProductsHeld"}
-        df_prods_held_data = df_prods_held_data.rename(columns=dict_prods_held_data_cols)
-        # Drop any row in the data frame that contains a duplicate value of Client ID.
-        df_prods_held_data.drop_duplicates("ClientID", inplace=True)
+        df_prods_held_data = self.format_raw_data(df_prods_held_data, self.raw_prods_held_data_col_dict)
         return df_prods_held_data
 
     def prepare_avg_txn_amt_data(self, avg_txn_amt_data_file):
@@ -103,11 +227,7 @@ class LoanUptakeRatePredictionDataProcessor:
         :return A pandas dataframe containing the pre-processed average transaction amounts data.
         """
         df_avg_txn_amt_data = self.load_data_to_df(avg_txn_amt_data_file)
-        dict_avg_txn_amt_data_cols = {"Client ID": "ClientID",
-                                      "Average amount of CA transaction": "AvgTxnAmt"}
-        df_avg_txn_amt_data = df_avg_txn_amt_data.rename(columns=dict_avg_txn_amt_data_cols)
-        # Drop any row in the data frame that contains a duplicate value of Client ID.
-        df_avg_txn_amt_data.drop_duplicates("ClientID", inplace=True)
+        df_avg_txn_amt_data = self.format_raw_data(df_avg_txn_amt_data, self.raw_avg_txn_amt_data_col_dict)
         return df_avg_txn_amt_data
 
     def prepare_txn_details_data(self, txn_details_data_file):
@@ -118,14 +238,7 @@ class LoanUptakeRatePredictionDataProcessor:
         :return A pandas dataframe containing the pre-processed transaction details data.
         """
         df_txn_details_data = self.load_data_to_df(txn_details_data_file)
-        dict_txn_details_data_cols = {"Client": "ClientID",
-                                      "Num Transactions": "NoOfTxns",
-                                      "Last TXN Amount": "LastTxnAmt",
-                                      "Merchant Code": "MerCode",
-                                      "Last Transaction Narrative": "LastTxnNrtv"}
-        df_txn_details_data = df_txn_details_data.rename(columns=dict_txn_details_data_cols)
-        # Drop any row in the data frame that contains a duplicate value of Client ID.
-        df_txn_details_data.drop_duplicates('ClientID', inplace=True)
+        df_txn_details_data = self.format_raw_data(df_txn_details_data, self.raw_txn_details_data_col_dict)
         return df_txn_details_data
 
     def prepare_loan_flag_data(self, loan_flag_data_file):
@@ -136,73 +249,225 @@ class LoanUptakeRatePredictionDataProcessor:
         :return A pandas dataframe containing the pre-processed loan flag data.
         """
         df_loan_flag_data = self.load_data_to_df(loan_flag_data_file)
-        dict_loan_flag_data_cols = {"Client ID": "ClientID",
-                                    "Loan Flag": "LoanFlag"}
-        df_loan_flag_data = df_loan_flag_data.rename(columns=dict_loan_flag_data_cols)
-        # Drop any row in the data frame that contains a duplicate value of Client ID.
-        df_loan_flag_data.drop_duplicates("ClientID", inplace=True)
+        df_loan_flag_data = self.format_raw_data(df_loan_flag_data, self.raw_loan_flag_data_col_dict)
         return df_loan_flag_data
 
-    def prepare_combined_data_frame_list(self, list_of_input_files):
+    def format_raw_records(self, raw_record_list):
         """
-        Public: Method to generate a list of pandas dataframe objects by loading the data from each individual CSV file
-        and applying the first level of pre-processing on them.
-        :param list_of_input_files: A list containing the names of all CSV files containing the required data.
-        :return A list containing all the pandas dataframe objects loaded with the data from CSV files.
+        Public: Method to generate a merged pandas dataframe object from raw records, each holding the columns of the
+        raw data files (other than the loan flag) for one client, e.g. as received by the online scoring service. The
+        columns are renamed as in the first level of pre-processing and any missing column is added with empty values.
+        :param raw_record_list: A list of dictionary objects, each mapping the raw column names to the values.
+        :return A pandas dataframe object containing the data of the records, in the layout of the merged data.
         """
-        data_frame_list = []
+        raw_record_col_dict = self.raw_record_col_dict
+        # The values are kept as objects (like the dirty columns of the raw CSV files), so that e.g. an integer column
+        # with a missing value isn't turned into floats.
+        df_loan_data = pd.DataFrame(raw_record_list, dtype=object).rename(columns=raw_record_col_dict)
+        # The Client ID may be given under the column name of more than one file, in which case the first one is kept.
+        df_loan_data = df_loan_data.loc[:, ~df_loan_data.columns.duplicated()]
+        df_loan_data = df_loan_data.reindex(columns=list(dict.fromkeys(raw_record_col_dict.values())))
+        return df_loan_data
 
-        # Load & Pre-Process Demographic Data
-        demographic_data_file = list_of_input_files[0]
-        df_demographics_data = self.prepare_demographic_data(demographic_data_file)
-        data_frame_list.append(df_demographics_data)
+    def rename_raw_record(self, raw_record):
+        """
+        Public: Method to rename the columns of a single raw record as in the first level of pre-processing (the
+        columns that aren't raw data columns are left out).
+        :param raw_record: A dictionary object mapping the raw column names to the values.
+        :return A dictionary object mapping the processed column names to the raw values.
+        """
+        record_values = {}
+        for raw_col, raw_value in raw_record.items():
+            col = self.raw_record_col_dict.get(raw_col)
+            # The Client ID may be given under the column name of more than one file, in which case the first one is
+            # kept.
+            if col is not None and col not in record_values:
+                record_values[col] = raw_value
+        return record_values
 
-        # Load & Pre-Process Previous Loan Held Data
-        prev_loan_data_file = list_of_input_files[1]
-        df_prev_loan_data = self.prepare_previous_loan_data(prev_loan_data_file)
-        data_frame_list.append(df_prev_loan_data)
+    def clean_raw_record(self, raw_record):
+        """
+        Public: Method to clean a single raw record (e.g. as received by the online scoring service) without building
+        a dataframe. The cleaning rules of process_input_data() are applied to each value in turn, with the memoized
+        county resolver and the merchant category lookup held in memory, and the cleaned values are typed as the batch
+        scorer reads them back from the processed data (a missing integer value is NaN).
+        :param raw_record: A dictionary object mapping the raw column names to the values.
+        :return A dictionary object mapping the processed column names to the cleaned values.
+        """
+        record_values = self.rename_raw_record(raw_record)
+        merchant_category_lookup = self.reference_data_registry.get_merchant_category_lookup(
+            self.ext_merchant_category_file)
+
+        age_value = re.sub(self.whole_number_suffix_pattern, '', str(record_values.get('Age', np.nan)))
+        gender_value = str(record_values.get('Gender', np.nan)).strip()
+        lower_gender_value = gender_value.lower()
+        if lower_gender_value.startswith('f'):
+            gender_code = 0
+        elif lower_gender_value.startswith('m'):
+            gender_code = 1
+        elif gender_value in ('0', '1'):
+            gender_code = int(gender_value)
+        else:
+            gender_code = -1
 
-        # Load & Pre-Process Products Held Data
-        prods_held_data_file = list_of_input_files[2]
-        df_prods_held_data = self.prepare_prods_held_data(prods_held_data_file)
-        data_frame_list.append(df_prods_held_data)
+        income_limit_list = re.sub('\\W+', '-', str(record_values.get('IncomeGroup', np.nan))).split('-')
+        if len(income_limit_list) > 2:
+            raise ValueError("IncomeGroup value {!r} has more than two limits".format(record_values['IncomeGroup']))
+        lower_limit = pd.to_numeric(income_limit_list[0])
+        upper_limit = pd.to_numeric(income_limit_list[1]) if len(income_limit_list) == 2 else np.nan
+        income_category_conditions = self.get_income_category_conditions(lower_limit, upper_limit)
+        income_category = next((income_category for income_category_condition, income_category
+                                in zip(income_category_conditions, self.income_category_values)
+                                if income_category_condition), 'Lower Middle')
 
-        # Load & Pre-Process Average Transaction Amount Data
-        avg_txn_amt_data_file = list_of_input_files[3]
-        df_avg_txn_amt_data = self.prepare_avg_txn_amt_data(avg_txn_amt_data_file)
-        data_frame_list.append(df_avg_txn_amt_data)
+        loan_held_before_value = str(record_values.get('LoanHeldBefore', np.nan))
+        prods_held_value = str(record_values.get('NoOfProductsHeld', np.nan))
+        avg_txn_amt_value = re.sub('[^0-9]', '', str(record_values.get('AvgTxnAmt', np.nan)))
+        no_of_txns_value = record_values.get('NoOfTxns', np.nan)
+        last_txn_amt_value = record_values.get('LastTxnAmt', np.nan)
+        mer_code_value = record_values.get('MerCode', np.nan)
+        mer_code = 0 if mer_code_value is None or mer_code_value != mer_code_value else int(mer_code_value)
 
-        # Load & Pre-Process Transaction Details Data
-        txn_details_data_file = list_of_input_files[4]
-        df_txn_details_data = self.prepare_txn_details_data(txn_details_data_file)
-        data_frame_list.append(df_txn_details_data)
+        return {'ClientID': record_values.get('ClientID'),
+                'Age': int(age_value) if age_value.isdigit() else np.nan,
+                'Gender': gender_code,
+                'County': self.resolve_county_value(str(record_values.get('County', np.nan))),
+                'LoanHeldBefore': int(loan_held_before_value) if loan_held_before_value in ('0', '1') else -1,
+                'NoOfProductsHeld': int(prods_held_value) if prods_held_value.isdigit() else 0,
+                'AvgTxnAmt': float(avg_txn_amt_value) if avg_txn_amt_value else np.nan,
+                'NoOfTxns': np.nan if pd.isna(no_of_txns_value) or no_of_txns_value == ""
+                else int(no_of_txns_value),
+                'LastTxnAmt': np.nan if last_txn_amt_value is None else float(last_txn_amt_value),
+                'IncomeCategory': income_category,
+                'MerCategory': merchant_category_lookup.get(mer_code, np.nan)}
 
+    def get_data_frame_preparation_tasks(self, list_of_input_files):
+        """
+        Public: Method to list the loading & pre-processing tasks (the name of the method preparing the data and the
+        name of the CSV file it is applied to) for each individual CSV file, in the order of the input list.
+        :param list_of_input_files: A list containing the names of all CSV files containing the required data.
+        :return A list of (method name, file name) tuples.
+        """
+        preparation_method_list = ['prepare_demographic_data', 'prepare_previous_loan_data', 'prepare_prods_held_data',
+                                   'prepare_avg_txn_amt_data', 'prepare_txn_details_data']
         # Load & Pre-Process Loan Flag Data
         if len(list_of_input_files) == 6:
             if list_of_input_files[5] != "" and list_of_input_files[5] is not None:
-                loan_flag_data_file = list_of_input_files[5]
-                df_loan_flag_data = self.prepare_loan_flag_data(loan_flag_data_file)
-                data_frame_list.append(df_loan_flag_data)
+                preparation_method_list.append('prepare_loan_flag_data')
+        return list(zip(preparation_method_list, list_of_input_files))
 
+    def run_data_frame_preparation_tasks(self, preparation_task_list):
+        """
+        Public: Method to run the loading & pre-processing tasks, either one after another or concurrently on a pool of
+        'ingestion_workers' threads or processes (as per 'ingestion_pool_type'). None of the tasks depend on each
+        other, so the time taken follows the slowest file rather than the sum of all files.
+        :param preparation_task_list: A list of (method name, file name) tuples.
+        :return A list containing the pandas dataframe objects returned by the tasks, in the order of the input list.
+        """
+        if not self.ingestion_workers:
+            return [getattr(self, method_name)(data_file_name) for method_name, data_file_name in preparation_task_list]
+
+        pool_executor_class = ProcessPoolExecutor if self.ingestion_pool_type == "process" else ThreadPoolExecutor
+        with pool_executor_class(max_workers=self.ingestion_workers) as pool_executor:
+            task_futures = [pool_executor.submit(getattr(self, method_name), data_file_name)
+                            for method_name, data_file_name in preparation_task_list]
+            return [task_future.result() for task_future in task_futures]
+
+    def prepare_combined_data_frame_list(self, list_of_input_files):
+        """
+        Public: Method to generate a list of pandas dataframe objects by loading the data from each individual CSV file
+        and applying the first level of pre-processing on them.
+        :param list_of_input_files: A list containing the names of all CSV files containing the required data.
+        :return A list containing all the pandas dataframe objects loaded with the data from CSV files.
+        """
+        preparation_task_list = self.get_data_frame_preparation_tasks(list_of_input_files)
+        data_frame_list = self.run_data_frame_preparation_tasks(preparation_task_list)
         return data_frame_list
 
+    def prepare_combined_data_frame_lists(self, list_of_input_file_lists):
+        """
+        Public: Method to generate the lists of pandas dataframe objects for several data sets (e.g. training and
+        testing) at once, so that the files of all the data sets are loaded together on the ingestion pool.
+        :param list_of_input_file_lists: A list containing one list of CSV file names per data set.
+        :return A list containing one list of pandas dataframe objects per data set, in the order of the input list.
+        """
+        preparation_task_lists = [self.get_data_frame_preparation_tasks(list_of_input_files)
+                                  for list_of_input_files in list_of_input_file_lists]
+        data_frame_list = self.run_data_frame_preparation_tasks(
+            [preparation_task for preparation_task_list in preparation_task_lists
+             for preparation_task in preparation_task_list])
+
+        data_frame_lists = []
+        for preparation_task_list in preparation_task_lists:
+            data_frame_lists.append(data_frame_list[:len(preparation_task_list)])
+            data_frame_list = data_frame_list[len(preparation_task_list):]
+        return data_frame_lists
+
     def combine_all_dataframes(self, data_frame_list):
         """
         Public: Method to merge all the pandas dataframe objects in the input list into a single one, based on
-        the common column 'ClientID'.
+        the common column 'ClientID' (inner join). Each dataframe object is indexed on 'ClientID' once and all of them
+        are aligned in a single operation; when 'sorted_join_fast_path' is enabled and every dataframe object is
+        already ordered by 'ClientID', the common IDs are instead found by intersecting the sorted keys.
         :param data_frame_list: A list containing all the pandas dataframe objects loaded with the data from CSV files.
         :return A merged pandas dataframe object containing the data from each individual dataframe object in the list.
         """
-        df_unified_loan_data = reduce(lambda left, right: pd.merge(left, right, on='ClientID'), data_frame_list)
+        indexed_data_frame_list = [df_data.set_index('ClientID') for df_data in data_frame_list]
+        if not all(df_data.index.is_unique for df_data in indexed_data_frame_list) or \
+                len({df_data.index.dtype for df_data in indexed_data_frame_list}) > 1:
+            # Only the deduplicated dataframe objects with the same type of Client IDs can be aligned on their index
+            # (aligning e.g. integer and float IDs would turn every ID into a float), the rest are merged pairwise.
+            df_unified_loan_data = reduce(lambda left, right: pd.merge(left, right, on='ClientID'), data_frame_list)
+        elif self.sorted_join_fast_path and all(df_data.index.is_monotonic_increasing
+                                                for df_data in indexed_data_frame_list):
+            common_client_ids = reduce(lambda left, right: np.intersect1d(left, right, assume_unique=True),
+                                       [df_data.index.values for df_data in indexed_data_frame_list])
+            aligned_data_frame_list = [df_data.iloc[np.searchsorted(df_data.index.values, common_client_ids)]
+                                       for df_data in indexed_data_frame_list]
+            df_unified_loan_data = pd.concat(aligned_data_frame_list, axis=1).reset_index()
+        else:
+            df_unified_loan_data = pd.concat(indexed_data_frame_list, axis=1, join='inner', sort=False).reset_index()
         return df_unified_loan_data
 
+    def add_to_join_drop_report(self, list_of_input_files, data_frame_list, no_of_joined_rows):
+        """
+        Public: Method to add the rows merged from each source file to the join drop report, which is keyed by file
+        name and summed up across the merges of the run (e.g. the partitions of a streamed data set). Each source holds
+        a single row per client, so every row of the merged data was joined from each source, and the rest of the rows
+        of a source had no match in the others and were dropped.
+        :param list_of_input_files: A list containing the names of all CSV files containing the required data.
+        :param data_frame_list: A list containing the pandas dataframe objects merged (None for a source without
+        any rows to merge, e.g. in a partition).
+        :param no_of_joined_rows: The number of rows of the merged data.
+        """
+        for data_file_name, df_data in zip(list_of_input_files, data_frame_list):
+            source_report = self.join_drop_report.setdefault(data_file_name, {"Rows": 0, "JoinedRows": 0,
+                                                                              "DroppedRows": 0})
+            source_report["Rows"] += 0 if df_data is None else len(df_data)
+            source_report["JoinedRows"] += no_of_joined_rows
+            source_report["DroppedRows"] = source_report["Rows"] - source_report["JoinedRows"]
+
+    def print_join_drop_report(self):
+        """
+        Public: Method to print the number of rows of each source file dropped by the merges of the run.
+        """
+        for data_file_name, source_report in self.join_drop_report.items():
+            print("Join dropped {DroppedRows} of {Rows} rows from '{DataFileName}'.".format(
+                DataFileName=data_file_name, **source_report))
+
     def load_training_data(self):
         """
         Public: Method to generate a merged pandas dataframe object containing the data to train the model.
         :return A pandas dataframe object containing the training data.
         """
-        training_data_frames_list = self.prepare_combined_data_frame_list(self.raw_training_data_file_list)
-        df_training_data = self.combine_all_dataframes(training_data_frames_list)
+        self.set_instrumented_data_set("training")
+        training_data_frames_list = self.run_stage('prepare_combined_data_frame_list',
+                                                   self.prepare_combined_data_frame_list,
+                                                   self.raw_training_data_file_list)
+        df_training_data = self.run_stage('combine_all_dataframes', self.combine_all_dataframes,
+                                          training_data_frames_list)
+        self.add_to_join_drop_report(self.raw_training_data_file_list, training_data_frames_list,
+                                     len(df_training_data))
         return df_training_data
 
     def load_testing_data(self):
@@ -210,40 +475,281 @@ class LoanUptakeRatePredictionDataProcessor:
         Public: Method to generate a merged pandas dataframe object containing the data to test the model.
         :return A pandas dataframe object containing the testing data.
         """
-        testing_data_frames_list = self.prepare_combined_data_frame_list(self.raw_test_data_file_list)
-        df_testing_data = self.combine_all_dataframes(testing_data_frames_list)
+        self.set_instrumented_data_set("testing")
+        testing_data_frames_list = self.run_stage('prepare_combined_data_frame_list',
+                                                  self.prepare_combined_data_frame_list, self.raw_test_data_file_list)
+        df_testing_data = self.run_stage('combine_all_dataframes', self.combine_all_dataframes,
+                                         testing_data_frames_list)
+        self.add_to_join_drop_report(self.raw_test_data_file_list, testing_data_frames_list, len(df_testing_data))
         return df_testing_data
 
+    def load_training_and_testing_data(self):
+        """
+        Public: Method to generate the merged pandas dataframe objects containing the data to train and to test the
+        model. When an ingestion pool is configured, the files of both data sets are loaded concurrently.
+        :return A tuple containing the training data and the testing data pandas dataframe objects.
+        """
+        if not self.ingestion_workers:
+            return self.load_training_data(), self.load_testing_data()
+
+        self.set_instrumented_data_set("training & testing")
+        training_data_frames_list, testing_data_frames_list = self.run_stage(
+            'prepare_combined_data_frame_lists', self.prepare_combined_data_frame_lists,
+            [self.raw_training_data_file_list, self.raw_test_data_file_list])
+        self.set_instrumented_data_set("training")
+        df_training_data = self.run_stage('combine_all_dataframes', self.combine_all_dataframes,
+                                          training_data_frames_list)
+        self.set_instrumented_data_set("testing")
+        df_testing_data = self.run_stage('combine_all_dataframes', self.combine_all_dataframes,
+                                         testing_data_frames_list)
+        self.add_to_join_drop_report(self.raw_training_data_file_list, training_data_frames_list,
+                                     len(df_training_data))
+        self.add_to_join_drop_report(self.raw_test_data_file_list, testing_data_frames_list, len(df_testing_data))
+        return df_training_data, df_testing_data
+
+    def stream_process_data(self, list_of_input_files, processed_data_file):
+        """
+        Public: Method to load, merge and clean the data partition by partition, and append the cleaned rows to the
+        processed data file, so that 'streaming_chunk_size' (rather than the size of the raw data files) bounds the
+        memory used. Every raw data file is read in chunks and its rows are spilled to disk in partitions on
+        'ClientID', of about 'streaming_chunk_size' clients each: a partition holds every row of its clients, so it is
+        merged and cleaned on its own. The cleaned rows are spilled again by their row number in the demographic data
+        file and written out range by range in that order, so the result is the same as processing the data in memory.
+        :param list_of_input_files: A list containing the names of all CSV files containing the required data.
+        :param processed_data_file: Name of the CSV file to write the processed data into.
+        :return The number of rows written to the processed data file.
+        """
+        if "feather" in self.processed_data_formats:
+            raise ValueError("The 'feather' format can't be written chunk by chunk, use 'parquet' when streaming.")
+        no_of_demographic_rows = self.run_stage('count_raw_data_rows', self.count_raw_data_rows,
+                                                list_of_input_files[0])
+        no_of_partitions = max(1, math.ceil(no_of_demographic_rows / self.streaming_chunk_size))
+        no_of_files = len(self.get_data_frame_preparation_tasks(list_of_input_files))
+        no_of_rows_written = 0
+        parquet_writer = None
+        os.makedirs(self.streaming_spill_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=self.streaming_spill_dir) as spill_dir:
+            self.run_stage('spill_raw_data_partitions', self.spill_raw_data_partitions, list_of_input_files,
+                           no_of_partitions, spill_dir)
+            for partition_no in range(no_of_partitions):
+                data_frame_list = self.run_stage('load_spilled_partition', self.load_spilled_partition, spill_dir,
+                                                 partition_no, no_of_files)
+                if any(df_data is None for df_data in data_frame_list):
+                    # One of the files has no rows in the partition, so none of its clients are joined.
+                    self.add_to_join_drop_report(list_of_input_files, data_frame_list, 0)
+                    continue
+                df_loan_data = self.run_stage('combine_all_dataframes', self.combine_all_dataframes, data_frame_list)
+                self.add_to_join_drop_report(list_of_input_files, data_frame_list, len(df_loan_data))
+                if len(df_loan_data) == 0:
+                    continue
+                # Keep the row number of each client in the demographic data file, to write the rows in that order.
+                df_demographics_data = data_frame_list[0]
+                demographic_row_nos = df_demographics_data.index.values[
+                    pd.Index(df_demographics_data['ClientID']).get_indexer(df_loan_data['ClientID'])]
+                processed_data = self.process_input_data(df_loan_data)
+                self.run_stage('spill_processed_data', self.spill_processed_data,
+                               processed_data.set_axis(demographic_row_nos), spill_dir)
+
+            for row_range_no in range(no_of_partitions):
+                processed_data_chunk = self.run_stage('load_spilled_processed_data', self.load_spilled_processed_data,
+                                                      spill_dir, row_range_no)
+                if processed_data_chunk is None:
+                    continue
+                parquet_writer = self.run_stage('write_processed_data_chunk', self.write_processed_data_chunk,
+                                                processed_data_chunk, processed_data_file, no_of_rows_written > 0,
+                                                parquet_writer)
+                no_of_rows_written += len(processed_data_chunk)
+
+        if parquet_writer is not None:
+            parquet_writer.close()
+        return no_of_rows_written
+
+    def count_raw_data_rows(self, data_file_name):
+        """
+        Public: Method to count the rows of a raw data file, reading only its first column, chunk by chunk.
+        :param data_file_name: Name of the CSV file which contains the data.
+        :return The number of rows of the file.
+        """
+        return sum(len(df_data_chunk) for df_data_chunk in pd.read_csv(data_file_name, encoding=self.encoding_format,
+                                                                        usecols=[0],
+                                                                        chunksize=self.streaming_chunk_size))
+
+    def spill_raw_data_partitions(self, list_of_input_files, no_of_partitions, spill_dir):
+        """
+        Public: Method to read each raw data file in chunks of 'streaming_chunk_size' rows, apply the first level of
+        pre-processing to each chunk and spill its rows into the partition files of their Client IDs (the rows of a
+        client from every file land in the same partition). The rows keep their row numbers in the file as the index.
+        :param list_of_input_files: A list containing the names of all CSV files containing the required data.
+        :param no_of_partitions: The number of partitions.
+        :param spill_dir: Name of the directory holding the spill files.
+        :return The number of rows spilled.
+        """
+        no_of_rows_spilled = 0
+        for file_no, (_, data_file_name) in enumerate(self.get_data_frame_preparation_tasks(list_of_input_files)):
+            # The chunks are read with the same fixed column types as the whole file, so that a chunk holding a dirty
+            # value (e.g. a blank 'Age') is cleaned the same way as in memory.
+            for df_data_chunk in pd.read_csv(data_file_name, encoding=self.encoding_format,
+                                             dtype=self.get_raw_data_col_dtype_dict(),
+                                             chunksize=self.streaming_chunk_size):
+                df_data_chunk = self.format_raw_data(df_data_chunk, self.raw_data_col_dict_list[file_no])
+                partition_nos = self.get_client_id_partition_nos(df_data_chunk, no_of_partitions)
+                for partition_no, df_partition_data in df_data_chunk.groupby(partition_nos, sort=False):
+                    self.append_to_spill_file(os.path.join(
+                        spill_dir, "Partition_{}_File_{}.pkl".format(partition_no, file_no)), df_partition_data)
+                no_of_rows_spilled += len(df_data_chunk)
+        return no_of_rows_spilled
+
+    def load_spilled_partition(self, spill_dir, partition_no, no_of_files):
+        """
+        Public: Method to load the rows spilled into a partition from each raw data file. A client may appear in more
+        than one chunk of a file, in which case its first row is kept (as when the whole file is loaded).
+        :param spill_dir: Name of the directory holding the spill files.
+        :param partition_no: The number of the partition.
+        :param no_of_files: The number of raw data files spilled.
+        :return A list containing a pandas dataframe object for each raw data file (None when the file has no rows in
+        the partition).
+        """
+        data_frame_list = []
+        for file_no in range(no_of_files):
+            df_data = self.load_spill_file(os.path.join(spill_dir, "Partition_{}_File_{}.pkl".format(partition_no,
+                                                                                                      file_no)))
+            data_frame_list.append(None if df_data is None else df_data.drop_duplicates("ClientID"))
+        return data_frame_list
+
+    def spill_processed_data(self, processed_data, spill_dir):
+        """
+        Public: Method to spill the cleaned rows of a partition into the files of their ranges of row numbers in the
+        demographic data file (of 'streaming_chunk_size' rows each).
+        :param processed_data: A pandas dataframe object containing the cleaned rows, indexed on their row numbers.
+        :param spill_dir: Name of the directory holding the spill files.
+        """
+        for row_range_no, df_row_range_data in processed_data.groupby(
+                processed_data.index.values // self.streaming_chunk_size, sort=False):
+            self.append_to_spill_file(os.path.join(spill_dir, "Processed_{}.pkl".format(row_range_no)),
+                                      df_row_range_data)
+
+    def load_spilled_processed_data(self, spill_dir, row_range_no):
+        """
+        Public: Method to load the cleaned rows spilled into a range of row numbers, in the order of the row numbers.
+        :param spill_dir: Name of the directory holding the spill files.
+        :param row_range_no: The number of the range of row numbers.
+        :return A pandas dataframe object containing the cleaned rows (None when the range has no rows).
+        """
+        processed_data = self.load_spill_file(os.path.join(spill_dir, "Processed_{}.pkl".format(row_range_no)))
+        if processed_data is None:
+            return None
+        return processed_data.sort_index().reset_index(drop=True)
+
+    def append_to_spill_file(self, spill_file_name, df_data):
+        """
+        Public: Method to append the rows of a pandas dataframe object to a spill file (as a pickled piece).
+        :param spill_file_name: Name of the spill file.
+        :param df_data: A pandas dataframe object containing the rows.
+        """
+        with open(spill_file_name, 'ab') as spill_file:
+            pickle.dump(df_data, spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load_spill_file(self, spill_file_name):
+        """
+        Public: Method to load all the pieces appended to a spill file.
+        :param spill_file_name: Name of the spill file.
+        :return A pandas dataframe object containing the rows of every piece (None when nothing was spilled).
+        """
+        if not os.path.exists(spill_file_name):
+            return None
+        data_frame_list = []
+        with open(spill_file_name, 'rb') as spill_file:
+            while True:
+                try:
+                    data_frame_list.append(pickle.load(spill_file))
+                except EOFError:
+                    break
+        return pd.concat(data_frame_list)
+
+    def write_processed_data_chunk(self, processed_data_chunk, processed_data_file, append_flag, parquet_writer):
+        """
+        Public: Method to append a cleaned chunk to the processed data file in each of the formats listed in
+        'processed_data_formats' (other than 'feather', which can't be written chunk by chunk).
+        :param processed_data_chunk: A pandas dataframe object containing a chunk of the processed data.
+        :param processed_data_file: Name of the CSV file to write the processed data into.
+        :param append_flag: A boolean flag indicating whether the chunk follows earlier chunks or is the first one.
+        :param parquet_writer: The parquet writer the earlier chunks were written with (None for the first chunk).
+        :return The parquet writer, to write the next chunks with (None when the 'parquet' format isn't written).
+        """
+        if "csv" in self.processed_data_formats:
+            processed_data_chunk.to_csv(processed_data_file, index=False, header=not append_flag,
+                                        mode='a' if append_flag else 'w')
+        if "parquet" in self.processed_data_formats:
+            # Each chunk is written as a row group, cast to the schema of the first chunk (with the integer columns
+            # widened, as the smallest integer type that fits may differ from chunk to chunk).
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            typed_data_table = pa.Table.from_pandas(self.get_typed_data_frame(processed_data_chunk),
+                                                    preserve_index=False)
+            if parquet_writer is None:
+                parquet_schema = pa.schema([pa.field(field.name, pa.int64()) if pa.types.is_integer(field.type)
+                                            else field for field in typed_data_table.schema],
+                                           metadata=typed_data_table.schema.metadata)
+                parquet_writer = pq.ParquetWriter(self.get_processed_data_file_name(processed_data_file, "parquet"),
+                                                  parquet_schema)
+            parquet_writer.write_table(typed_data_table.cast(parquet_writer.schema))
+        return parquet_writer
+
     def clean_age_values(self, df_loan_data):
         """
-        Public: Method to clean the data within the 'Age' column in the pandas dataframe.
+        Public: Method to clean the data within the 'Age' column in the pandas dataframe. The whole-number ages written
+        as floats (e.g. '36.0', as a column with missing values is exported) are kept as whole numbers, and the other
+        non-numeric ages are left empty.
         :param df_loan_data: A pandas dataframe object containing the data.
         :return A pandas dataframe object containing the cleaned 'Age' data.
         """
-        df_loan_data['Age'] = df_loan_data['Age'].astype(str)
-        for index, row in df_loan_data.iterrows():
-            if not row['Age'].isdigit():
-                df_loan_data.loc[index, 'Age'] = ""
+        def clean_raw_age_values(age_values):
+            age_values = age_values.astype(str).str.replace(self.whole_number_suffix_pattern, '', regex=True)
+            return age_values.where(age_values.str.isdigit(), "")
+
+        df_loan_data['Age'] = self.clean_col_values(df_loan_data['Age'], clean_raw_age_values)
         return df_loan_data
 
+    def clean_col_values(self, col_values, clean_raw_values):
+        """
+        Public: Method to apply a cleaning rule to a column. A categorical column (read as such with the compact
+        dtypes) is cleaned through its categories: the rule is applied once to the distinct raw values, and each row
+        takes the cleaned value of its code, so that the rows are never expanded into strings. The cleaned column is
+        then a categorical as well.
+        :param col_values: A pandas series object containing the raw values of the column.
+        :param clean_raw_values: A function cleaning a pandas series object of raw values.
+        :return A pandas series object containing the cleaned values.
+        """
+        if not isinstance(col_values.dtype, CategoricalDtype):
+            return clean_raw_values(col_values)
+        row_codes = col_values.cat.codes.to_numpy()
+        raw_values = list(col_values.cat.categories)
+        if (row_codes == -1).any():
+            # The missing values (code -1) take the cleaned value of NaN, put last.
+            raw_values.append(np.nan)
+        cleaned_values = np.asarray(clean_raw_values(pd.Series(raw_values, dtype=object)), dtype=object)
+        cleaned_codes, cleaned_categories = pd.factorize(cleaned_values)
+        return pd.Series(pd.Categorical.from_codes(cleaned_codes[row_codes], cleaned_categories),
+                         index=col_values.index)
+
     def clean_gender_values(self, df_loan_data):
         """
         Public: Method to clean the data within the 'Gender' column in the pandas dataframe.
         :param df_loan_data: A pandas dataframe object containing the data.
         :return A pandas dataframe object containing the cleaned 'Gender' data.
         """
-        df_loan_data['Gender'] = df_loan_data['Gender'].astype(str)
-        for index, row in df_loan_data.iterrows():
-            if row['Gender'].strip().lower().startswith('f'):
-                df_loan_data.loc[index, 'Gender'] = 0
-            elif row['Gender'].strip().lower().startswith('m'):
-                df_loan_data.loc[index, 'Gender'] = 1
-            elif row['Gender'].strip() == '0':
-                df_loan_data.loc[index, 'Gender'] = 0
-            elif row['Gender'].strip() == '1':
-                df_loan_data.loc[index, 'Gender'] = 1
-            else:
-                df_loan_data.loc[index, 'Gender'] = -1
+        def clean_raw_gender_values(gender_values):
+            gender_values = gender_values.astype(str).str.strip()
+            lower_gender_values = gender_values.str.lower()
+            # Conditions are evaluated in order, so the first matching rule wins (as in an if/elif chain).
+            gender_conditions = [lower_gender_values.str.startswith('f'),
+                                 lower_gender_values.str.startswith('m'),
+                                 gender_values == '0',
+                                 gender_values == '1']
+            gender_codes = [0, 1, 0, 1]
+            return np.select(gender_conditions, gender_codes, default=-1)
+
+        df_loan_data['Gender'] = self.clean_col_values(df_loan_data['Gender'], clean_raw_gender_values)
         return df_loan_data
 
     def clean_income_category_values(self, df_loan_data):
@@ -252,56 +758,99 @@ class LoanUptakeRatePredictionDataProcessor:
         :param df_loan_data: A pandas dataframe object containing the data.
         :return A pandas dataframe object containing the cleaned 'Income Category' data.
         """
-        df_loan_data['IncomeGroup'] = df_loan_data['IncomeGroup'].astype(str)
-        df_loan_data['IncomeGroup'] = df_loan_data['IncomeGroup'].str.replace('\\W+', '-')
-        df_loan_data[['LowerLimit', 'UpperLimit']] = df_loan_data['IncomeGroup'].str.split('-', expand=True)
-        df_loan_data['LowerLimit'] = pd.to_numeric(df_loan_data['LowerLimit'])
-        df_loan_data['UpperLimit'] = pd.to_numeric(df_loan_data['UpperLimit'])
-
-        income_category_conditions = [(df_loan_data['LowerLimit'] >= 0) & (df_loan_data['UpperLimit'] <= 10000),
-                                (df_loan_data['LowerLimit'] >= 10001) & (df_loan_data['UpperLimit'] <= 40000),
-                                (df_loan_data['LowerLimit'] >= 40001) & (df_loan_data['UpperLimit'] <= 60000),
-                                (df_loan_data['LowerLimit'] >= 60001) & (df_loan_data['UpperLimit'] <= 100000),
-                                (df_loan_data['LowerLimit'] > 100000)]
-        income_category_values = ['Low', 'Lower Middle', 'Upper', 'Upper Middle', 'High']
-        df_loan_data['IncomeCategory'] = np.select(income_category_conditions, income_category_values,
-                                                   default='Lower Middle')
+        def clean_raw_income_group_values(income_group_values):
+            df_income_group_data = pd.DataFrame(index=income_group_values.index)
+            df_income_group_data['IncomeGroup'] = income_group_values.astype(str).str.replace('\\W+', '-')
+            df_income_group_data[['LowerLimit', 'UpperLimit']] = df_income_group_data['IncomeGroup'].str.split(
+                '-', expand=True)
+            income_category_conditions = self.get_income_category_conditions(
+                pd.to_numeric(df_income_group_data['LowerLimit']), pd.to_numeric(df_income_group_data['UpperLimit']))
+            return np.select(income_category_conditions, self.income_category_values, default='Lower Middle')
+
+        df_loan_data['IncomeCategory'] = self.clean_col_values(df_loan_data['IncomeGroup'],
+                                                               clean_raw_income_group_values)
         df_loan_data['IncomeCategory'] = df_loan_data['IncomeCategory'].astype(
-            CategoricalDtype(categories=income_category_values))
-        df_loan_data = df_loan_data.drop(['IncomeGroup', 'LowerLimit', 'UpperLimit'], axis=1)
+            CategoricalDtype(categories=self.income_category_values))
+        df_loan_data = df_loan_data.drop(['IncomeGroup'], axis=1)
         return df_loan_data
 
+    def get_income_category_conditions(self, lower_limits, upper_limits):
+        """
+        Public: Method to evaluate the conditions of each income category (in the order of 'income_category_values',
+        the first matching one wins) on the lower and upper limits of the income groups.
+        :param lower_limits: The lower limits (a pandas series object, or a single value).
+        :param upper_limits: The upper limits (a pandas series object, or a single value).
+        :return A list containing the result of each condition.
+        """
+        return [(lower_limits >= 0) & (upper_limits <= 10000),
+                (lower_limits >= 10001) & (upper_limits <= 40000),
+                (lower_limits >= 40001) & (upper_limits <= 60000),
+                (lower_limits >= 60001) & (upper_limits <= 100000),
+                (lower_limits > 100000)]
+
+    def load_county_lookup_index(self):
+        """
+        Public: Method to get the lookup structures used to resolve the 'County' values (the town to county dictionary
+        and the set of known county names) from the reference data registry, which loads them once per process.
+        :return A tuple containing the town to county dictionary and the set of county names.
+        """
+        county_lookup_index = self.reference_data_registry.get_county_lookup(self.ext_county_town_file)
+        if county_lookup_index is not self.county_lookup_index:
+            # The county data was (re)loaded, so the resolutions memoized from any earlier version are dropped.
+            self.resolve_county_value.cache_clear()
+            self.county_lookup_index = county_lookup_index
+        return county_lookup_index
+
+    def resolve_county_value(self, raw_county_value):
+        """
+        Public: Method to resolve a single raw 'County' value into its cleaned county name. The results are memoized
+        in a bounded cache (see __init__), which stays warm across the training and testing runs.
+        :param raw_county_value: A raw 'County' value (as a string).
+        :return The cleaned county name.
+        """
+        county_town_data_dict, county_name_set = self.county_lookup_index or self.load_county_lookup_index()
+        county_value = raw_county_value.strip()
+        lower_county_value = county_value.lower()
+        resolved_county = raw_county_value
+        if raw_county_value.isdigit():
+            resolved_county = "Unknown"
+        if lower_county_value == "sandyford":
+            resolved_county = "Dublin"
+        elif 'dublin' in lower_county_value or 'blin' in lower_county_value:
+            resolved_county = "Dublin"
+        elif 'cork' in lower_county_value:
+            resolved_county = "Cork"
+        elif 'kildare' in lower_county_value:
+            resolved_county = "Kildare"
+        elif 'galway' in lower_county_value:
+            resolved_county = "Galway"
+        elif county_value in county_town_data_dict:
+            resolved_county = county_town_data_dict[county_value].split("/")[0].strip()
+        elif county_value not in county_name_set:
+            resolved_county = "Outside ROI"
+        elif county_value == "":
+            resolved_county = "Unknown"
+        resolved_county = resolved_county.replace(".", "")
+        resolved_county = resolved_county.replace("Co ", "")
+        resolved_county = resolved_county.replace("co ", "")
+        resolved_county = resolved_county.replace("County ", "")
+        return resolved_county
+
     def clean_county_values(self, df_loan_data):
         """
-        Public: Method to clean the data within the 'County' column in the pandas dataframe.
+        Public: Method to clean the data within the 'County' column in the pandas dataframe. Each distinct raw value
+        is resolved only once and the results are then mapped back onto the column.
         :param df_loan_data: A pandas dataframe object containing the data.
         :return A pandas dataframe object containing the cleaned 'County' data.
         """
-        county_town_data_dict = self.load_external_data_dict(self.ext_county_town_file)
-        df_loan_data['County'] = df_loan_data['County'].astype(str)
-        for index, row in df_loan_data.iterrows():
-            if row['County'].isdigit():
-                df_loan_data.loc[index, 'County'] = "Unknown"
-            if row['County'].strip().lower() == "sandyford":
-                df_loan_data.loc[index, 'County'] = "Dublin"
-            elif 'dublin' in row['County'].strip().lower() or 'blin' in row['County'].strip().lower():
-                df_loan_data.loc[index, 'County'] = "Dublin"
-            elif 'cork' in row['County'].strip().lower():
-                df_loan_data.loc[index, 'County'] = "Cork"
-            elif 'kildare' in row['County'].strip().lower():
-                df_loan_data.loc[index, 'County'] = "Kildare"
-            elif 'galway' in row['County'].strip().lower():
-                df_loan_data.loc[index, 'County'] = "Galway"
-            elif row['County'].strip() in county_town_data_dict:
-                df_loan_data.loc[index, 'County'] = county_town_data_dict[row['County'].strip()].split("/")[0].strip()
-            elif row['County'].strip() not in set(list(county_town_data_dict.values())):
-                df_loan_data.loc[index, 'County'] = "Outside ROI"
-            elif row['County'].strip() is None or row['County'].strip() == "":
-                df_loan_data.loc[index, 'County'] = "Unknown"
-        df_loan_data['County'] = df_loan_data['County'].str.replace(".", "")
-        df_loan_data['County'] = df_loan_data['County'].str.replace("Co ", "")
-        df_loan_data['County'] = df_loan_data['County'].str.replace("co ", "")
-        df_loan_data['County'] = df_loan_data['County'].str.replace("County ", "")
+        def clean_raw_county_values(county_values):
+            county_codes, distinct_county_values = pd.factorize(county_values.astype(str))
+            resolved_county_values = np.array([self.resolve_county_value(county_value)
+                                               for county_value in distinct_county_values], dtype=object)
+            return resolved_county_values[county_codes]
+
+        self.load_county_lookup_index()
+        df_loan_data['County'] = self.clean_col_values(df_loan_data['County'], clean_raw_county_values)
         return df_loan_data
 
     def clean_loan_held_before_values(self, df_loan_data):
@@ -310,10 +859,12 @@ class LoanUptakeRatePredictionDataProcessor:
         :param df_loan_data: A pandas dataframe object containing the data.
         :return A pandas dataframe object containing the cleaned 'LoanHeldBefore' data.
         """
-        df_loan_data['LoanHeldBefore'] = df_loan_data['LoanHeldBefore'].astype(str)
-        for index, row in df_loan_data.iterrows():
-            if row['LoanHeldBefore'] != '0' and row['LoanHeldBefore'] != '1':
-                df_loan_data.loc[index, 'LoanHeldBefore'] = -1
+        def clean_raw_loan_held_before_values(loan_held_before_values):
+            loan_held_before_values = loan_held_before_values.astype(str)
+            return loan_held_before_values.where(loan_held_before_values.isin(['0', '1']), -1)
+
+        df_loan_data['LoanHeldBefore'] = self.clean_col_values(df_loan_data['LoanHeldBefore'],
+                                                               clean_raw_loan_held_before_values)
         return df_loan_data
 
     def clean_prods_held_values(self, df_loan_data):
@@ -322,28 +873,34 @@ class LoanUptakeRatePredictionDataProcessor:
         :param df_loan_data: A pandas dataframe object containing the data.
         :return A pandas dataframe object containing the cleaned 'NoOfProductsHeld' data.
         """
-        df_loan_data['NoOfProductsHeld'] = df_loan_data['NoOfProductsHeld'].astype(str)
-        for index, row in df_loan_data.iterrows():
-            if not row['NoOfProductsHeld'].isdigit():
-                df_loan_data.loc[index, 'NoOfProductsHeld'] = 0
-            else:
-                if int(row['NoOfProductsHeld']) < 0:
-                    df_loan_data.loc[index, 'NoOfProductsHeld'] = 0
+        def clean_raw_prods_held_values(prods_held_values):
+            prods_held_values = prods_held_values.astype(str)
+            # A value made up only of digits can never be negative, so non-digit values (including '-1') are set to 0.
+            return prods_held_values.where(prods_held_values.str.isdigit(), 0)
+
+        df_loan_data['NoOfProductsHeld'] = self.clean_col_values(df_loan_data['NoOfProductsHeld'],
+                                                                 clean_raw_prods_held_values)
         return df_loan_data
 
     def clean_avg_txt_amt_values(self, df_loan_data):
         """
-        Public: Method to clean the data within the 'AvgTxnAmt' column in the pandas dataframe.
+        Public: Method to clean the data within the 'AvgTxnAmt' column in the pandas dataframe. Every character other
+        than the digits 0-9 (currency symbols, separators and control characters) is stripped from the values in a
+        single pass over the column, and the result is parsed into a float (values left empty become NaN).
         :param df_loan_data: A pandas dataframe object containing the data.
         :return A pandas dataframe object containing the cleaned 'AvgTxnAmt' data.
         """
-        df_loan_data['AvgTxnAmt'] = df_loan_data['AvgTxnAmt'].astype(str)
-        for index, row in df_loan_data.iterrows():
-            temp_str = ""
-            for ch in row['AvgTxnAmt']:
-                if 48 <= ord(ch) <= 57:     # Handling Control Characters appearing in values
-                    temp_str += ch
-            df_loan_data.loc[index, 'AvgTxnAmt'] = temp_str
+        raw_avg_txn_amt_values = df_loan_data['AvgTxnAmt'].astype(str)
+        avg_txn_amt_values = raw_avg_txn_amt_values.str.replace('[^0-9]', '', regex=True)
+        empty_value_mask = avg_txn_amt_values == ""
+        # Record the feed quality figures, so that they can be monitored without another scan of the column.
+        self.avg_txn_amt_quality_stats = {"TotalValues": len(avg_txn_amt_values),
+                                          "ChangedValues": int((avg_txn_amt_values != raw_avg_txn_amt_values).sum()),
+                                          "EmptyValues": int(empty_value_mask.sum())}
+        if self.print_reports:
+            print("AvgTxnAmt sanitised: {ChangedValues} of {TotalValues} values changed, {EmptyValues} empty."
+                  .format(**self.avg_txn_amt_quality_stats))
+        df_loan_data['AvgTxnAmt'] = avg_txn_amt_values.mask(empty_value_mask).astype(float)
         return df_loan_data
 
     def clean_txn_details_values(self, df_loan_data):
@@ -352,10 +909,11 @@ class LoanUptakeRatePredictionDataProcessor:
         :param df_loan_data: A pandas dataframe object containing the data.
         :return A pandas dataframe object containing the cleaned 'MerCode' and 'LastTxnNrtv' data.
         """
-        merchant_category_data_dict = self.load_external_data_dict(self.ext_merchant_category_file)
-        merchant_category_data_dict[0] = "Unknown"      # Appending the value for missing merchant categories
+        # The lookup includes the 'Unknown' value for the missing merchant categories (code 0)
+        merchant_category_lookup = self.reference_data_registry.get_merchant_category_lookup(
+            self.ext_merchant_category_file)
         df_loan_data['MerCode'] = df_loan_data['MerCode'].fillna(0).astype(np.int64)
-        df_loan_data['MerCategory'] = df_loan_data['MerCode'].map(merchant_category_data_dict)
+        df_loan_data['MerCategory'] = df_loan_data['MerCode'].map(merchant_category_lookup)
         df_loan_data.drop(columns=['MerCode', 'LastTxnNrtv'], inplace=True)
 
         return df_loan_data
@@ -368,11 +926,23 @@ class LoanUptakeRatePredictionDataProcessor:
         """
         df_col_list = df_loan_data.columns
         for col in self.integer_var_col_list:
-            df_loan_data[col] = df_loan_data[col].astype(int)
+            col_values = df_loan_data[col].replace("", np.nan)
+            if col_values.isna().any():
+                # Values left empty by the cleaning rules (e.g. the non-numeric ages) are kept as missing values,
+                # and the nullable integers keep the other values of the column as they are.
+                df_loan_data[col] = pd.to_numeric(col_values).astype("Int64")
+            else:
+                df_loan_data[col] = col_values.astype(int)
+        if 'LoanFlag' in df_col_list and not df_loan_data['LoanFlag'].hasnans:
+            # The loan flags are read as nullable integers, and kept as such only when some of them are missing.
+            df_loan_data['LoanFlag'] = df_loan_data['LoanFlag'].astype(np.int64)
 
         for col in self.float_var_col_list:
             df_loan_data[col] = df_loan_data[col].astype(float)
 
+        if self.compact_dtypes:
+            return self.compact_col_dtypes(df_loan_data)
+
         for col in self.category_var_col_list:
             if col in df_col_list:
                 df_loan_data[col] = df_loan_data[col].astype(object)
@@ -386,44 +956,419 @@ class LoanUptakeRatePredictionDataProcessor:
         #     df_loan_data = df_loan_data[cols]
         return df_loan_data
 
+    def get_category_dtype_plan(self):
+        """
+        Public: Method to build (once per version of the reference data) the fixed category sets of the category
+        columns, from the values the cleaning rules and the external data can produce.
+        :return A dictionary object mapping the name of each category column to its pandas CategoricalDtype.
+        """
+        reference_data_version = self.get_reference_data_version()
+        if self.category_dtype_plan is None or self.category_dtype_plan[0] != reference_data_version:
+            county_town_data_dict, county_name_set = self.load_county_lookup_index()
+            county_categories = {self.resolve_county_value(county_value)
+                                 for county_value in list(county_town_data_dict) + list(county_name_set)}
+            county_categories.update(["Outside ROI", "Unknown"])
+            merchant_category_lookup = self.reference_data_registry.get_merchant_category_lookup(
+                self.ext_merchant_category_file)
+            merchant_categories = set(merchant_category_lookup.dropna())
+            self.category_dtype_plan = (reference_data_version,
+                                        {'Gender': CategoricalDtype(categories=[-1, 0, 1]),
+                                         'County': CategoricalDtype(categories=sorted(county_categories)),
+                                         'LoanHeldBefore': CategoricalDtype(categories=[-1, 0, 1]),
+                                         'MerCategory': CategoricalDtype(categories=sorted(merchant_categories))})
+        return self.category_dtype_plan[1]
+
+    def get_reference_data_version(self):
+        """
+        Public: Method to get the version hash of the reference data (the towns & counties and the merchant categories)
+        used to clean the data, so that the results can be tied to it.
+        :return The version hash of the reference data.
+        """
+        return self.reference_data_registry.get_version_hash([self.ext_county_town_file,
+                                                              self.ext_merchant_category_file])
+
+    def get_config_fingerprint(self):
+        """
+        Public: Method to list every config value the processed data depends on (the encoding, the column renames and
+        dtypes the raw data files are loaded with, and the dtypes the cleaned columns are restored to), so that the
+        results cached or stored for an earlier config are never reused.
+        :return A tuple containing the config values.
+        """
+        return (self.encoding_format, self.raw_data_col_dict_list, self.raw_data_col_dtype_dict,
+                self.integer_var_col_list, self.float_var_col_list, self.category_var_col_list, self.compact_dtypes)
+
+    def compact_col_dtypes(self, df_loan_data):
+        """
+        Public: Method to store the category columns in the pandas dataframe as pandas categoricals (with the fixed
+        category sets from 'get_category_dtype_plan') and downcast the integer columns to the smallest integer type
+        that fits their values. The memory used by each column is printed before and after.
+        :param df_loan_data: A pandas dataframe object containing the cleaned data.
+        :return A pandas dataframe object containing the cleaned data in the compact dtypes.
+        """
+        if self.print_reports:
+            col_memory_before = df_loan_data.memory_usage(index=False, deep=True)
+        for col in self.integer_var_col_list:
+            df_loan_data[col] = pd.to_numeric(df_loan_data[col], downcast='integer')
+
+        category_dtype_plan = self.get_category_dtype_plan()
+        for col in self.category_var_col_list:
+            if col in df_loan_data.columns and col in category_dtype_plan:
+                col_values = df_loan_data[col]
+                col_categories = category_dtype_plan[col].categories
+                if pd.api.types.is_numeric_dtype(col_categories):
+                    # Codes held as a mix of numbers and strings (e.g. -1 and '0') are converted into numbers.
+                    col_values = pd.to_numeric(col_values)
+                # Any value outside the fixed category set is added to the set, rather than being lost.
+                unexpected_categories = pd.Index(col_values.dropna().unique()).difference(col_categories)
+                df_loan_data[col] = col_values.astype(CategoricalDtype(
+                    categories=col_categories.append(unexpected_categories)))
+
+        if self.print_reports:
+            col_memory_after = df_loan_data.memory_usage(index=False, deep=True)
+            df_memory_report = pd.DataFrame({'Dtype': df_loan_data.dtypes.astype(str),
+                                             'BytesBefore': col_memory_before,
+                                             'BytesAfter': col_memory_after})
+            print("Memory used per column (compact dtypes):")
+            print(df_memory_report.to_string())
+        return df_loan_data
+
+    def run_cleaning_stages(self, df_loan_data):
+        """
+        Public: Method to run each cleaning stage in 'cleaning_stage_list' on the data, one after another.
+        :param df_loan_data: A pandas dataframe object containing the data merged from the CSV files.
+        :return A pandas dataframe object containing all the required columns in cleaned format.
+        """
+        for cleaning_method_name in self.cleaning_stage_list:
+            df_loan_data = self.run_stage(cleaning_method_name, getattr(self, cleaning_method_name), df_loan_data)
+        return df_loan_data
+
+    def get_client_id_partition_nos(self, df_loan_data, no_of_partitions):
+        """
+        Public: Method to hash-partition the rows on 'ClientID'. The hash is fixed (unlike the salted hash of python
+        strings), so a client always lands in the same partition.
+        :param df_loan_data: A pandas dataframe object containing the data.
+        :param no_of_partitions: The number of partitions.
+        :return A numpy array containing the partition number of each row.
+        """
+        return pd.util.hash_array(df_loan_data['ClientID'].values) % no_of_partitions
+
+    def partition_by_client_id(self, df_loan_data, no_of_shards):
+        """
+        Public: Method to hash-partition the rows on 'ClientID' into shards.
+        :param df_loan_data: A pandas dataframe object containing the data merged from the CSV files.
+        :param no_of_shards: The number of shards.
+        :return A list containing the (ascending) row positions of each non-empty shard.
+        """
+        shard_nos = self.get_client_id_partition_nos(df_loan_data, no_of_shards)
+        shard_position_list = [np.flatnonzero(shard_nos == shard_no) for shard_no in range(no_of_shards)]
+        return [shard_positions for shard_positions in shard_position_list if len(shard_positions)]
+
+    def process_input_data_shard(self, df_loan_data_shard):
+        """
+        Public: Method to clean a shard of the data in a worker process (on its own copy of this object). The data
+        quality report is returned rather than printed, and the compact dtypes are left to be applied once the shards
+        are joined back, as the category sets and integer widths must be the same across the whole data set.
+        :param df_loan_data_shard: A pandas dataframe object containing a shard of the merged data.
+        :return A tuple containing the cleaned shard and the 'AvgTxnAmt' quality figures of the shard.
+        """
+        self.print_reports = False
+        self.compact_dtypes = False
+        df_loan_data_shard = self.run_cleaning_stages(df_loan_data_shard)
+        return df_loan_data_shard, self.avg_txn_amt_quality_stats
+
+    def process_input_data_in_shards(self, df_loan_data):
+        """
+        Public: Method to clean the data on a pool of 'cleaning_workers' processes. The rows are hash-partitioned on
+        'ClientID' into one shard per worker, every cleaning stage is run on each shard (the cleaning rules only look
+        at one row at a time), and the cleaned shards are joined back in the original row order, so that the result is
+        the same as cleaning the data on one core.
+        :param df_loan_data: A pandas dataframe object containing the data merged from the CSV files.
+        :return A pandas dataframe object containing all the required columns in cleaned format.
+        """
+        shard_position_list = self.partition_by_client_id(df_loan_data, self.cleaning_workers)
+        with ProcessPoolExecutor(max_workers=self.cleaning_workers) as pool_executor:
+            shard_futures = [pool_executor.submit(self.process_input_data_shard, df_loan_data.iloc[shard_positions])
+                             for shard_positions in shard_position_list]
+            shard_result_list = [shard_future.result() for shard_future in shard_futures]
+
+        # Put each row back at its original position (the shards are concatenated in shard order).
+        df_cleaned_data = pd.concat([df_cleaned_shard for df_cleaned_shard, _ in shard_result_list])
+        df_cleaned_data = df_cleaned_data.iloc[np.argsort(np.concatenate(shard_position_list), kind='stable')]
+
+        self.avg_txn_amt_quality_stats = {stat_name: sum(shard_quality_stats[stat_name]
+                                                         for _, shard_quality_stats in shard_result_list)
+                                          for stat_name in ["TotalValues", "ChangedValues", "EmptyValues"]}
+        if self.print_reports:
+            print("AvgTxnAmt sanitised: {ChangedValues} of {TotalValues} values changed, {EmptyValues} empty."
+                  .format(**self.avg_txn_amt_quality_stats))
+        if self.compact_dtypes:
+            df_cleaned_data = self.compact_col_dtypes(df_cleaned_data)
+        return df_cleaned_data
+
     def process_input_data(self, df_loan_data):
         """
-        Public: Method to clean the input data within the columns in the pandas dataframe.
+        Public: Method to clean the input data within the columns in the pandas dataframe. When 'cleaning_workers' is
+        set, the data sets of at least 'cleaning_shard_min_rows' rows are cleaned in shards on a pool of processes.
         :param df_loan_data: A pandas dataframe object containing the data merged from the CSV files.
         :return A pandas dataframe object containing all the required columns in cleaned format.
         """
-        df_loan_data = self.clean_age_values(df_loan_data)
-        df_loan_data = self.clean_gender_values(df_loan_data)
-        df_loan_data = self.clean_income_category_values(df_loan_data)
-        df_loan_data = self.clean_county_values(df_loan_data)
-        df_loan_data = self.clean_loan_held_before_values(df_loan_data)
-        df_loan_data = self.clean_prods_held_values(df_loan_data)
-        df_loan_data = self.clean_avg_txt_amt_values(df_loan_data)
-        df_loan_data = self.clean_txn_details_values(df_loan_data)
+        if self.cleaning_workers and len(df_loan_data) >= self.cleaning_shard_min_rows:
+            return self.run_stage('process_input_data_in_shards', self.process_input_data_in_shards, df_loan_data)
+        return self.run_cleaning_stages(df_loan_data)
+
+    def process_data_with_stage_cache(self, list_of_input_files):
+        """
+        Public: Method to load, merge and clean the data, reusing the stage results held in the stage cache. The key
+        of each stage is chained from the key of the previous stage, the name of the stage and the content hashes of
+        the external data files it reads; the first key is built from the content hashes of the input files, the
+        relevant config values and this module's source. The pipeline resumes after the last stage found in the cache,
+        and the result of each stage run is stored in the cache.
+        :param list_of_input_files: A list containing the names of all CSV files containing the required data.
+        :return A pandas dataframe object containing all the required columns in cleaned format.
+        """
+        stage_cache = self.stage_result_cache
+        stage_name_list = ['prepare_combined_data_frame_list', 'combine_all_dataframes'] + self.cleaning_stage_list
+        stage_key = stage_cache.get_stage_key(self.get_config_fingerprint(),
+                                              stage_cache.get_file_content_hash(__file__),
+                                              *[stage_cache.get_file_content_hash(data_file_name)
+                                                for data_file_name in list_of_input_files if data_file_name])
+        stage_key_list = []
+        for stage_name in stage_name_list:
+            stage_key = stage_cache.get_stage_key(stage_key, stage_name,
+                                                  *[stage_cache.get_file_content_hash(reference_file_name)
+                                                    for reference_file_name in
+                                                    self.stage_reference_file_dict.get(stage_name, [])])
+            stage_key_list.append(stage_key)
+
+        # Resume the pipeline after the last stage whose result is cached
+        stage_result = list_of_input_files
+        first_stage_no = 0
+        for stage_no in reversed(range(len(stage_name_list))):
+            if stage_cache.contains(stage_key_list[stage_no]):
+                stage_result = self.run_stage('load_cached_' + stage_name_list[stage_no], stage_cache.load,
+                                              stage_key_list[stage_no])
+                first_stage_no = stage_no + 1
+                break
+
+        for stage_no in range(first_stage_no, len(stage_name_list)):
+            stage_input = stage_result
+            stage_result = self.run_stage(stage_name_list[stage_no], getattr(self, stage_name_list[stage_no]),
+                                          stage_input)
+            if stage_name_list[stage_no] == 'combine_all_dataframes':
+                # The merges served from the cache aren't reported, as their inputs aren't loaded.
+                self.add_to_join_drop_report(list_of_input_files, stage_input, len(stage_result))
+            self.run_stage('store_cached_' + stage_name_list[stage_no], stage_cache.store, stage_key_list[stage_no],
+                           stage_result)
+        return stage_result
+
+    def process_data_incrementally(self, list_of_input_files, delta_store_file):
+        """
+        Public: Method to load the data and process only the clients inserted or updated since the last run, keeping
+        the processed rows of the unchanged clients from the delta store. The clients are told apart by the
+        fingerprints of their raw rows across all the files; the store is rebuilt in full whenever the config values,
+        this module's source or the reference data change. The result is the same as processing all the data.
+        :param list_of_input_files: A list containing the names of all CSV files containing the required data.
+        :param delta_store_file: Name of the file holding the delta store of the data set.
+        :return A pandas dataframe object containing all the required columns in cleaned format.
+        """
+        delta_store = DeltaProcessedStore(delta_store_file)
+        delta_store.load(delta_store.get_store_version(self.get_config_fingerprint(),
+                                                       delta_store.get_file_content_hash(__file__),
+                                                       self.get_reference_data_version()))
+
+        data_frame_list = self.run_stage('prepare_combined_data_frame_list', self.prepare_combined_data_frame_list,
+                                         list_of_input_files)
+        client_fingerprints = self.run_stage('get_client_fingerprints', delta_store.get_client_fingerprints,
+                                             data_frame_list)
+        inserted_client_ids, updated_client_ids, deleted_client_ids = delta_store.find_changed_clients(
+            client_fingerprints)
+        self.delta_change_report = {"Inserted": len(inserted_client_ids), "Updated": len(updated_client_ids),
+                                    "Deleted": len(deleted_client_ids),
+                                    "Unchanged": len(client_fingerprints) - len(inserted_client_ids) -
+                                    len(updated_client_ids)}
+        if self.print_reports:
+            print("Delta processing: {Inserted} inserted, {Updated} updated, {Deleted} deleted and {Unchanged} "
+                  "unchanged clients.".format(**self.delta_change_report))
+
+        changed_client_ids = inserted_client_ids.append(updated_client_ids)
+        df_changed_data = None
+        if len(changed_client_ids):
+            df_changed_data = self.run_stage('combine_all_dataframes', self.combine_all_dataframes,
+                                             [df_data[df_data['ClientID'].isin(changed_client_ids)]
+                                              for df_data in data_frame_list])
+            # The changed clients may no longer match across all the files, leaving no rows to clean.
+            df_changed_data = self.process_input_data(df_changed_data) if len(df_changed_data) else None
+
+        df_loan_data = self.run_stage('upsert_processed_data', delta_store.upsert, df_changed_data,
+                                      updated_client_ids.append(deleted_client_ids),
+                                      data_frame_list[0]['ClientID'].values)
+        self.run_stage('save_delta_store', delta_store.save, client_fingerprints)
+        # The store holds the rows of every client joined across the files, as a full merge would.
+        self.add_to_join_drop_report(list_of_input_files, data_frame_list, len(df_loan_data))
+        return self.restore_upserted_col_dtypes(df_loan_data)
+
+    def restore_upserted_col_dtypes(self, df_loan_data):
+        """
+        Public: Method to restore the column dtypes of the processed data put together from the rows of several runs.
+        Each run sets the dtypes from its own rows (e.g. the integer columns with missing values, or the compact
+        integer widths and category sets), so they are set again from all the rows, as a single run would.
+        :param df_loan_data: A pandas dataframe object containing the processed rows of every client.
+        :return A pandas dataframe object containing the processed rows with the restored column dtypes.
+        """
+        if len(df_loan_data) == 0:
+            return df_loan_data
+        if self.compact_dtypes:
+            for col in self.get_category_dtype_plan():
+                if col in df_loan_data.columns:
+                    df_loan_data[col] = df_loan_data[col].astype(object)
+        print_reports = self.print_reports
+        self.print_reports = False
         df_loan_data = self.restore_valid_col_dtypes(df_loan_data)
+        self.print_reports = print_reports
+        return df_loan_data
+
+    def get_processed_data_file_name(self, processed_data_file, data_format):
+        """
+        Public: Method to get the name of the file holding the processed data in the given format. The columnar files
+        are placed next to the CSV file, with the same name and the format as the extension.
+        :param processed_data_file: Name of the CSV file containing the processed data.
+        :param data_format: One of the formats 'csv', 'parquet' or 'feather'.
+        :return The name of the processed data file in the given format.
+        """
+        return os.path.splitext(processed_data_file)[0] + "." + data_format
+
+    def get_typed_data_frame(self, df_loan_data):
+        """
+        Public: Method to generate the typed version of the processed data, which is stored in the columnar formats.
+        The integer and float columns are given their numeric types and the category columns are stored as pandas
+        categoricals.
+        :param df_loan_data: A pandas dataframe object containing the processed data.
+        :return A pandas dataframe object containing the processed data with the typed columns.
+        """
+        df_typed_data = df_loan_data.reset_index(drop=True)
+        for col in self.integer_var_col_list:
+            if not pd.api.types.is_integer_dtype(df_typed_data[col]):
+                df_typed_data[col] = df_typed_data[col].astype(np.int64)
+
+        for col in self.float_var_col_list:
+            df_typed_data[col] = df_typed_data[col].astype(float)
+
+        for col in self.category_var_col_list:
+            if col in df_typed_data.columns:
+                col_values = df_typed_data[col]
+                if col_values.dtype == object:
+                    # Codes held as a mix of numbers and strings (e.g. -1 and '0') are stored as numbers, which is
+                    # how they are read back from the CSV file.
+                    numeric_col_values = pd.to_numeric(col_values, errors='coerce')
+                    if numeric_col_values.notna().sum() == col_values.notna().sum():
+                        col_values = numeric_col_values
+                df_typed_data[col] = col_values.astype('category')
+        return df_typed_data
+
+    def write_processed_data(self, df_loan_data, processed_data_file):
+        """
+        Public: Method to write the processed data in each of the formats listed in 'processed_data_formats'.
+        :param df_loan_data: A pandas dataframe object containing the processed data.
+        :param processed_data_file: Name of the CSV file to write the processed data into.
+        :return A boolean flag indicating whether the processed data files were written or not.
+        """
+        if "csv" in self.processed_data_formats:
+            df_loan_data.to_csv(processed_data_file, index=False)
+        if "parquet" in self.processed_data_formats:
+            self.get_typed_data_frame(df_loan_data).to_parquet(
+                self.get_processed_data_file_name(processed_data_file, "parquet"), index=False)
+        if "feather" in self.processed_data_formats:
+            # Uncompressed feather files can be memory-mapped without copying the data.
+            self.get_typed_data_frame(df_loan_data).to_feather(
+                self.get_processed_data_file_name(processed_data_file, "feather"), compression="uncompressed")
+        return True
+
+    def load_processed_data(self, processed_data_file, columns=None, memory_map=True):
+        """
+        Public: Method to load the processed data from a columnar ('.parquet' or '.feather') file, with the column
+        types as they were written.
+        :param processed_data_file: Name of the parquet or feather file containing the processed data.
+        :param columns: A list containing the names of the columns to read (None reads all the columns).
+        :param memory_map: A boolean flag indicating whether to memory-map the file rather than read it.
+        :return A pandas dataframe object containing the processed data.
+        """
+        data_format = os.path.splitext(processed_data_file)[1]
+        if data_format == ".parquet":
+            import pyarrow.parquet as pq
+            typed_data_table = pq.read_table(processed_data_file, columns=columns, memory_map=memory_map)
+        elif data_format == ".feather":
+            import pyarrow.feather as feather
+            typed_data_table = feather.read_table(processed_data_file, columns=columns, memory_map=memory_map)
+        else:
+            raise ValueError("Unsupported processed data file format: '{}'".format(data_format))
+        df_loan_data = typed_data_table.to_pandas()
+        # Parquet only keeps the dictionary encoding of text columns, so the numeric category columns are restored here.
+        for col in self.category_var_col_list:
+            if col in df_loan_data.columns and not isinstance(df_loan_data[col].dtype, CategoricalDtype):
+                df_loan_data[col] = df_loan_data[col].astype('category')
         return df_loan_data
 
     def execution_package(self):
         """
-        Public: Method to clean the input data within the columns in the pandas dataframe.
+        Public: Method to clean the input data within the columns in the pandas dataframe. When the instrumentation is
+        enabled, the run report is written into 'run_report_file'.
         :return A boolean flag indicating whether the cleaned data files were generated or not.
         """
         exec_flag = False
-        df_training_data = self.load_training_data()
-        processed_training_data = self.process_input_data(df_training_data)
-        df_testing_data = self.load_testing_data()
-        processed_testing_data = self.process_input_data(df_testing_data)
-
-        tra_data_write_result = processed_training_data.to_csv(self.pro_training_data_file, index=False)
-        test_data_write_result = processed_testing_data.to_csv(self.pro_test_data_file, index=False)
-        if tra_data_write_result is None and test_data_write_result is None:
+        self.join_drop_report = {}
+        if self.stage_instrumentation is not None:
+            self.stage_instrumentation.start_run()
+
+        if self.streaming_chunk_size:
+            # Stream the data through the pipeline in partitions, to bound the memory used
+            self.set_instrumented_data_set("training")
+            self.stream_process_data(self.raw_training_data_file_list, self.pro_training_data_file)
+            self.set_instrumented_data_set("testing")
+            self.stream_process_data(self.raw_test_data_file_list, self.pro_test_data_file)
             exec_flag = True
+        else:
+            if self.delta_processing:
+                self.set_instrumented_data_set("training")
+                processed_training_data = self.process_data_incrementally(self.raw_training_data_file_list,
+                                                                          self.delta_training_store_file)
+                self.set_instrumented_data_set("testing")
+                processed_testing_data = self.process_data_incrementally(self.raw_test_data_file_list,
+                                                                         self.delta_testing_store_file)
+            elif self.stage_result_cache is not None:
+                self.set_instrumented_data_set("training")
+                processed_training_data = self.process_data_with_stage_cache(self.raw_training_data_file_list)
+                self.set_instrumented_data_set("testing")
+                processed_testing_data = self.process_data_with_stage_cache(self.raw_test_data_file_list)
+            else:
+                df_training_data, df_testing_data = self.load_training_and_testing_data()
+                self.set_instrumented_data_set("training")
+                processed_training_data = self.process_input_data(df_training_data)
+                self.set_instrumented_data_set("testing")
+                processed_testing_data = self.process_input_data(df_testing_data)
+
+            self.set_instrumented_data_set("training")
+            tra_data_write_result = self.run_stage('write_processed_data', self.write_processed_data,
+                                                   processed_training_data, self.pro_training_data_file)
+            self.set_instrumented_data_set("testing")
+            test_data_write_result = self.run_stage('write_processed_data', self.write_processed_data,
+                                                    processed_testing_data, self.pro_test_data_file)
+            if tra_data_write_result and test_data_write_result:
+                exec_flag = True
+
+        if self.print_reports:
+            self.print_join_drop_report()
+        if self.stage_instrumentation is not None:
+            self.stage_instrumentation.write_run_report(self.run_report_file,
+                                                        {"JoinDropReport": self.join_drop_report})
         return exec_flag
 
 
-obj_data_cleaner = LoanUptakeRatePredictionDataProcessor()
-success_flag = obj_data_cleaner.execution_package()
-if success_flag:
-    print("Successfully generated cleaned data files for Training & Testing sets.")
-else:
-    print("Files couldn't be generated.")
+if __name__ == "__main__":
+    obj_data_cleaner = LoanUptakeRatePredictionDataProcessor()
+    success_flag = obj_data_cleaner.execution_package()
+    if success_flag:
+        print("Successfully generated cleaned data files for Training & Testing sets.")
+        if obj_data_cleaner.stage_instrumentation is not None:
+            print("Run report written to " + obj_data_cleaner.run_report_file)
+    else:
+        print("Files couldn't be generated.")
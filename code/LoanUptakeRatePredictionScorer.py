@@ -0,0 +1,171 @@
+# Import the required libraries
+import os
+import warnings
+import joblib
+import pandas as pd
+import numpy as np
+import config as cfg
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+
+class LoanUptakeRatePredictionScorer:
+
+    def __init__(self):
+        self.encoding_format = cfg.ENCODING_FORMAT
+        self.integer_var_col_list = cfg.INTEGER_VAR_COL_LIST
+        self.float_var_col_list = cfg.FLOAT_VAR_COL_LIST
+        self.category_var_col_list = cfg.CATEGORY_VAR_COL_LIST
+        self.model_file = cfg.LOAN_LIKELIHOOD_MODEL_FILE
+        self.scoring_data_file = cfg.SCORING_DATA_FILE_NAME
+        self.pre_loan_likelihood_file = cfg.PRE_LOAN_LIKELIHOOD_FILE
+        self.scoring_batch_size = cfg.SCORING_BATCH_SIZE
+        self.loan_data_pipeline = None
+
+    def load_model(self):
+        """
+        Public: Method to load the fitted model pipeline (saved with joblib) used to score the data. The pipeline is
+        loaded once per scorer object.
+        :return The fitted model pipeline.
+        """
+        if self.loan_data_pipeline is None:
+            self.loan_data_pipeline = joblib.load(self.model_file)
+        return self.loan_data_pipeline
+
+    def load_processed_data_batches(self, processed_data_file):
+        """
+        Public: Method to read the processed data in batches of 'scoring_batch_size' rows, so that the memory used
+        doesn't grow with the size of the file. The CSV, parquet and feather formats are supported.
+        :param processed_data_file: Name of the file containing the processed data.
+        :return A generator of pandas dataframe objects, each containing a batch of the processed data.
+        """
+        data_format = os.path.splitext(processed_data_file)[1]
+        if data_format == ".parquet":
+            import pyarrow.parquet as pq
+            for data_batch in pq.ParquetFile(processed_data_file).iter_batches(batch_size=self.scoring_batch_size):
+                yield data_batch.to_pandas()
+        elif data_format == ".feather":
+            import pyarrow.feather as feather
+            # The memory-mapped table is converted into a pandas dataframe object one slice at a time.
+            typed_data_table = feather.read_table(processed_data_file, memory_map=True)
+            for batch_start in range(0, typed_data_table.num_rows, self.scoring_batch_size):
+                yield typed_data_table.slice(batch_start, self.scoring_batch_size).to_pandas()
+        else:
+            for data_batch in pd.read_csv(processed_data_file, encoding=self.encoding_format,
+                                          chunksize=self.scoring_batch_size):
+                yield data_batch
+
+    def restore_model_col_dtypes(self, df_loan_data):
+        """
+        Public: Method to restore the column dtypes the model was trained with (the category columns are objects). An
+        integer column with missing values (e.g. the non-numeric ages) is restored as floats, which the model imputes.
+        :param df_loan_data: A pandas dataframe object containing the processed data.
+        :return A pandas dataframe object containing the processed data with the restored column dtypes.
+        """
+        for col in self.integer_var_col_list:
+            if df_loan_data[col].isna().any():
+                df_loan_data[col] = df_loan_data[col].astype(float)
+            else:
+                df_loan_data[col] = df_loan_data[col].astype(int)
+
+        for col in self.float_var_col_list:
+            df_loan_data[col] = df_loan_data[col].astype(float)
+
+        for col in self.category_var_col_list:
+            if col in df_loan_data.columns:
+                df_loan_data[col] = df_loan_data[col].astype(object)
+        return df_loan_data
+
+    def get_scorable_row_mask(self, df_loan_data):
+        """
+        Public: Method to flag the rows the model scores, i.e. all but the rows with the County value "Outside ROI" or
+        an unknown (-1) LoanHeldBefore value (which are dropped from the training data as noise).
+        :param df_loan_data: A pandas dataframe object containing the processed data, with the restored column dtypes.
+        :return A boolean pandas series object, True for the rows the model scores.
+        """
+        return (df_loan_data['County'] != "Outside ROI") & (df_loan_data['LoanHeldBefore'] != -1)
+
+    def get_model_features(self, df_loan_data):
+        """
+        Public: Method to select the columns the model is fed with (all but the Client ID and the loan flag).
+        :param df_loan_data: A pandas dataframe object containing the processed data.
+        :return A pandas dataframe object containing the features.
+        """
+        return df_loan_data.drop(columns=['ClientID', 'LoanFlag'], errors='ignore')
+
+    def prepare_data_batch(self, df_loan_data):
+        """
+        Public: Method to restore the column dtypes the model was trained with, and drop the rows the model doesn't
+        score (County value "Outside ROI" or unknown (-1) LoanHeldBefore value).
+        :param df_loan_data: A pandas dataframe object containing a batch of the processed data.
+        :return A tuple containing the list of Client IDs and the pandas dataframe object containing the features.
+        """
+        df_loan_data = self.restore_model_col_dtypes(df_loan_data)
+        df_loan_data = df_loan_data[self.get_scorable_row_mask(df_loan_data)]
+        client_id_list = df_loan_data['ClientID'].tolist()
+        df_loan_features = self.get_model_features(df_loan_data)
+        return client_id_list, df_loan_features
+
+    def get_uptake_rates(self, likelihood_log_probabilities):
+        """
+        Public: Method to compute the loan uptake rates (the probability of the positive class, as a percentage rounded
+        to 3 decimals) from the log probabilities predicted by the model.
+        :param likelihood_log_probabilities: A numpy array containing the log probabilities of each class per client.
+        :return A numpy array containing the loan uptake rate of each client.
+        """
+        likelihood_probabilities = np.exp(likelihood_log_probabilities)
+        return np.round(likelihood_probabilities[:, 1] / likelihood_probabilities.sum(axis=1) * 100, 3)
+
+    def get_categories_of_likelihood(self, loan_uptake_rates):
+        """
+        Public: Method to label each loan uptake rate with its likelihood category.
+        :param loan_uptake_rates: A numpy array containing the loan uptake rates.
+        :return A numpy array containing the likelihood category of each loan uptake rate.
+        """
+        likelihood_category_conditions = [(loan_uptake_rates >= 85.000) & (loan_uptake_rates <= 100.000),
+                                          (loan_uptake_rates >= 70.000) & (loan_uptake_rates <= 84.999),
+                                          (loan_uptake_rates >= 50.000) & (loan_uptake_rates <= 69.999),
+                                          (loan_uptake_rates >= 25.000) & (loan_uptake_rates <= 49.999)]
+        likelihood_category_values = ['Very High Likelihood', 'High Likelihood', 'Medium Likelihood', 'Low Likelihood']
+        return np.select(likelihood_category_conditions, likelihood_category_values, default='Very Low Likelihood')
+
+    def score_processed_data(self, processed_data_file, predicted_data_file):
+        """
+        Public: Method to score the processed data batch by batch, and append the loan uptake rate and likelihood
+        category of each client to the predicted data file.
+        :param processed_data_file: Name of the file containing the processed data.
+        :param predicted_data_file: Name of the CSV file to write the predicted loan likelihoods into.
+        :return The number of clients scored.
+        """
+        loan_data_pipeline = self.load_model()
+        no_of_clients_scored = 0
+        for df_loan_data in self.load_processed_data_batches(processed_data_file):
+            client_id_list, df_loan_features = self.prepare_data_batch(df_loan_data)
+            if len(client_id_list) == 0:
+                continue
+            loan_uptake_rates = self.get_uptake_rates(loan_data_pipeline.predict_log_proba(df_loan_features))
+            df_loan_likelihoods = pd.DataFrame({'Client ID': client_id_list,
+                                                'Uptake Rate': loan_uptake_rates,
+                                                'Likelihood Category': self.get_categories_of_likelihood(
+                                                    loan_uptake_rates)})
+            df_loan_likelihoods.to_csv(predicted_data_file, index=False, header=no_of_clients_scored == 0,
+                                       mode='w' if no_of_clients_scored == 0 else 'a')
+            no_of_clients_scored += len(df_loan_likelihoods)
+        return no_of_clients_scored
+
+    def execution_package(self):
+        """
+        Public: Method to score the processed testing data and generate the predicted loan likelihoods file.
+        :return A boolean flag indicating whether the predicted loan likelihoods file was generated or not.
+        """
+        no_of_clients_scored = self.score_processed_data(self.scoring_data_file, self.pre_loan_likelihood_file)
+        return no_of_clients_scored > 0
+
+
+if __name__ == "__main__":
+    obj_scorer = LoanUptakeRatePredictionScorer()
+    success_flag = obj_scorer.execution_package()
+    if success_flag:
+        print("Successfully generated the predicted loan likelihoods file.")
+    else:
+        print("File couldn't be generated.")
@@ -0,0 +1,489 @@
+# Import the required libraries
+import json
+import time
+import queue
+import threading
+import warnings
+import numpy as np
+import pandas as pd
+import config as cfg
+from collections import deque
+from concurrent.futures import Future
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
+from sklearn.feature_selection import SelectFromModel
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from LoanUptakeRatePredictionDataProcessor import LoanUptakeRatePredictionDataProcessor
+from LoanUptakeRatePredictionScorer import LoanUptakeRatePredictionScorer
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+
+class LoanUptakeRatePredictionService:
+
+    def __init__(self):
+        self.service_host = cfg.SERVICE_HOST
+        self.service_port = cfg.SERVICE_PORT
+        self.max_batch_size = cfg.SERVICE_MAX_BATCH_SIZE
+        self.max_batch_wait_seconds = cfg.SERVICE_MAX_BATCH_WAIT_MS / 1000
+        self.record_path_max_records = cfg.SERVICE_RECORD_PATH_MAX_RECORDS
+        self.category_var_col_list = cfg.CATEGORY_VAR_COL_LIST
+        self.data_processor = LoanUptakeRatePredictionDataProcessor()
+        # The reports are printed per batch of records, and the model is fed with the default (object) category dtypes.
+        self.data_processor.print_reports = False
+        self.data_processor.compact_dtypes = False
+        self.scorer = LoanUptakeRatePredictionScorer()
+        self.model_transform_list = None
+        self.model_classifier = None
+        # Feature layout of the fitted model pipeline (see cache_model_feature_layout), None when it isn't supported
+        self.numeric_feature_layout = None
+        self.category_feature_layout = None
+        self.no_of_model_features = None
+        self.selected_feature_indices = None
+        self.request_queue = queue.Queue()
+        self.request_latency_list = deque(maxlen=cfg.SERVICE_LATENCY_WINDOW)
+        self.metrics_lock = threading.Lock()
+        self.no_of_batches = 0
+        self.no_of_batched_records = 0
+        self.batching_thread = None
+        self.http_server = None
+
+    def warm_up(self):
+        """
+        Public: Method to load the fitted model pipeline and the reference lookups before the first request, so that
+        they are held in memory for the lifetime of the service.
+        """
+        loan_data_pipeline = self.scorer.load_model()
+        self.data_processor.load_county_lookup_index()
+        self.data_processor.reference_data_registry.get_merchant_category_lookup(
+            self.data_processor.ext_merchant_category_file)
+
+        # SelectFromModel works out the selected features from the importances of its estimator (e.g. every tree of a
+        # random forest) on each call, which costs more than the rest of the pipeline for a few records. The selected
+        # features are fixed once the pipeline is fitted, so they are worked out once here.
+        self.model_transform_list = []
+        self.model_classifier = loan_data_pipeline
+        if isinstance(loan_data_pipeline, Pipeline):
+            for _, model_step in loan_data_pipeline.steps[:-1]:
+                if model_step is None or model_step == 'passthrough':
+                    continue
+                if isinstance(model_step, SelectFromModel):
+                    selected_feature_indices = model_step.get_support(indices=True)
+                    self.model_transform_list.append(lambda loan_features, feature_indices=selected_feature_indices:
+                                                     loan_features[:, feature_indices])
+                else:
+                    self.model_transform_list.append(model_step.transform)
+            self.model_classifier = loan_data_pipeline.steps[-1][1]
+        self.cache_model_feature_layout(loan_data_pipeline)
+
+    def cache_model_feature_layout(self, loan_data_pipeline):
+        """
+        Public: Method to work out (once, when the service warms up) where each value of a cleaned record goes in the
+        features the classifier of the model is fed with, so that a single record can be scored without running the
+        pipeline on a dataframe. The layout is only cached for the pipelines it can be worked out from: a column
+        transformer of mean/constant imputers, min-max scalers and one-hot encoders (ignoring the unknown categories),
+        followed by feature selectors.
+        :param loan_data_pipeline: The fitted model pipeline.
+        :return A boolean flag indicating whether the layout was cached or not.
+        """
+        self.selected_feature_indices = None
+        if not isinstance(loan_data_pipeline, Pipeline) or \
+                not isinstance(loan_data_pipeline.steps[0][1], ColumnTransformer):
+            return False
+        numeric_feature_layout = []
+        category_feature_layout = []
+        feature_no = 0
+        for _, column_transformer, col_list in loan_data_pipeline.steps[0][1].transformers_:
+            if column_transformer == 'drop':
+                continue
+            if not isinstance(column_transformer, Pipeline) or not isinstance(col_list, (list, pd.Index)) or \
+                    not all(isinstance(col, str) for col in col_list):
+                return False
+            imputer, scaler, encoder = None, None, None
+            for step_no, (_, model_step) in enumerate(column_transformer.steps):
+                if isinstance(model_step, SimpleImputer) and step_no == 0 and not model_step.add_indicator and \
+                        pd.isna(model_step.missing_values) and model_step.missing_values is not None:
+                    imputer = model_step
+                elif isinstance(model_step, MinMaxScaler) and scaler is None and encoder is None and \
+                        not model_step.clip:
+                    scaler = model_step
+                elif isinstance(model_step, OneHotEncoder) and step_no == len(column_transformer.steps) - 1 and \
+                        scaler is None and model_step.handle_unknown == 'ignore' and model_step.drop_idx_ is None and \
+                        getattr(model_step, 'infrequent_categories_', None) is None:
+                    encoder = model_step
+                else:
+                    return False
+            fill_values = imputer.statistics_ if imputer is not None else np.full(len(col_list), np.nan)
+            if encoder is None:
+                # The imputer drops the columns that were all missing when it was fitted.
+                if imputer is not None and pd.isna(fill_values).any():
+                    return False
+                for col_no, col in enumerate(col_list):
+                    numeric_feature_layout.append((col, feature_no, float(fill_values[col_no]),
+                                                   scaler.scale_[col_no] if scaler is not None else 1.0,
+                                                   scaler.min_[col_no] if scaler is not None else 0.0))
+                    feature_no += 1
+            else:
+                for col_no, col in enumerate(col_list):
+                    category_feature_layout.append((col, fill_values[col_no],
+                                                    {category: feature_no + category_no for category_no, category
+                                                     in enumerate(encoder.categories_[col_no])}))
+                    feature_no += len(encoder.categories_[col_no])
+
+        selected_feature_indices = np.arange(feature_no)
+        for _, model_step in loan_data_pipeline.steps[1:-1]:
+            if model_step is None or model_step == 'passthrough':
+                continue
+            if not isinstance(model_step, SelectFromModel) or \
+                    model_step.n_features_in_ != len(selected_feature_indices):
+                return False
+            selected_feature_indices = selected_feature_indices[model_step.get_support(indices=True)]
+
+        self.numeric_feature_layout = numeric_feature_layout
+        self.category_feature_layout = category_feature_layout
+        self.no_of_model_features = feature_no
+        self.selected_feature_indices = selected_feature_indices
+        return True
+
+    def get_record_features(self, cleaned_record):
+        """
+        Public: Method to compute the features of a cleaned record with the cached model feature layout, as the
+        transformers of the model pipeline would (the missing values are imputed, then the numeric values are scaled
+        and the category values are one-hot encoded).
+        :param cleaned_record: A dictionary object mapping the processed column names to the cleaned values.
+        :return A numpy array containing the selected features of the record (as a single row).
+        """
+        record_features = np.zeros(self.no_of_model_features)
+        for col, feature_no, fill_value, feature_scale, feature_offset in self.numeric_feature_layout:
+            feature_value = float(cleaned_record[col])
+            if feature_value != feature_value:
+                feature_value = fill_value
+            record_features[feature_no] = feature_value * feature_scale + feature_offset
+        for col, fill_value, category_feature_dict in self.category_feature_layout:
+            category_value = cleaned_record[col]
+            if category_value != category_value:
+                category_value = fill_value
+            feature_no = category_feature_dict.get(category_value)
+            if feature_no is not None:
+                record_features[feature_no] = 1.0
+        return record_features[self.selected_feature_indices].reshape(1, -1)
+
+    def predict_log_proba(self, df_loan_features):
+        """
+        Public: Method to predict the log probabilities of each class with the fitted model pipeline, using the
+        selected features worked out by warm_up().
+        :param df_loan_features: A pandas dataframe object containing the features.
+        :return A numpy array containing the log probabilities of each class per client.
+        """
+        loan_features = df_loan_features
+        for model_transform in self.model_transform_list:
+            loan_features = model_transform(loan_features)
+        return self.model_classifier.predict_log_proba(loan_features)
+
+    def restore_processed_col_values(self, df_loan_data):
+        """
+        Public: Method to parse the integer values of the category columns (e.g. the '0' and '1' LoanHeldBefore values)
+        into integers, as they are when the batch scorer reads the processed data back from the CSV file, so that the
+        model is fed with the values it was trained with.
+        :param df_loan_data: A pandas dataframe object containing the processed data.
+        :return A pandas dataframe object containing the processed data with the parsed integer values.
+        """
+        def parse_category_value(category_value):
+            if isinstance(category_value, str) and category_value.lstrip('-').isdigit():
+                return int(category_value)
+            return category_value
+
+        for col in self.category_var_col_list:
+            if col in df_loan_data.columns:
+                df_loan_data[col] = df_loan_data[col].map(parse_category_value)
+        return df_loan_data
+
+    def score_raw_record(self, raw_record):
+        """
+        Public: Method to clean and score a single raw record without building a dataframe, with the cleaning rules
+        applied value by value and the cached model feature layout (or with score_raw_record_batch() when the layout
+        isn't cached). A record the model doesn't score (County value "Outside ROI" or unknown LoanHeldBefore value),
+        or with a value that can't be cleaned (e.g. a non-numeric Merchant Code), is flagged as not scored.
+        :param raw_record: A dictionary object holding the raw columns of one client.
+        :return A dictionary object containing the loan uptake rate and likelihood category of the record.
+        """
+        try:
+            if self.selected_feature_indices is None:
+                return self.score_raw_record_batch([raw_record])[0]
+            cleaned_record = self.data_processor.clean_raw_record(raw_record)
+        except (ValueError, TypeError, OverflowError):
+            return {'Client ID': self.get_result_client_id(
+                        self.data_processor.rename_raw_record(raw_record).get('ClientID')),
+                    'Scored': False, 'Uptake Rate': None, 'Likelihood Category': None}
+        if not self.scorer.get_scorable_row_mask(cleaned_record):
+            return {'Client ID': self.get_result_client_id(cleaned_record['ClientID']), 'Scored': False,
+                    'Uptake Rate': None, 'Likelihood Category': None}
+        loan_uptake_rates = self.scorer.get_uptake_rates(
+            self.model_classifier.predict_log_proba(self.get_record_features(cleaned_record)))
+        return {'Client ID': self.get_result_client_id(cleaned_record['ClientID']),
+                'Scored': True,
+                'Uptake Rate': float(loan_uptake_rates[0]),
+                'Likelihood Category': self.scorer.get_categories_of_likelihood(loan_uptake_rates)[0]}
+
+    def get_result_client_id(self, client_id):
+        """
+        Public: Method to get the Client ID returned in the result of a record, None (null in JSON) when the record
+        has no Client ID (a NaN isn't valid JSON).
+        :param client_id: The Client ID of the record (NaN when it's missing).
+        :return The Client ID, or None.
+        """
+        if isinstance(client_id, float) and client_id != client_id:
+            return None
+        return client_id
+
+    def score_raw_records(self, raw_record_list):
+        """
+        Public: Method to clean and score the raw records. Up to 'record_path_max_records' records are scored one by one
+        with score_raw_record() (when the model feature layout is cached), which costs less than building dataframes
+        for a few records; more records are scored with score_raw_record_batch(). A record with a value that can't be
+        cleaned fails the whole vectorized batch, in which case its records are scored one by one, so that only that
+        record is flagged as not scored.
+        :param raw_record_list: A list of dictionary objects, each holding the raw columns of one client.
+        :return A list of dictionary objects containing the loan uptake rate and likelihood category of each record.
+        """
+        if self.selected_feature_indices is None or len(raw_record_list) > self.record_path_max_records:
+            try:
+                return self.score_raw_record_batch(raw_record_list)
+            except (ValueError, TypeError, OverflowError):
+                pass
+        return [self.score_raw_record(raw_record) for raw_record in raw_record_list]
+
+    def score_raw_record_batch(self, raw_record_list):
+        """
+        Public: Method to clean and score the raw records with a single (vectorized) call to the model. The records the
+        model doesn't score (County value "Outside ROI" or unknown LoanHeldBefore value) are flagged as not scored.
+        :param raw_record_list: A list of dictionary objects, each holding the raw columns of one client.
+        :return A list of dictionary objects containing the loan uptake rate and likelihood category of each record.
+        """
+        df_loan_data = self.data_processor.format_raw_records(raw_record_list)
+        df_loan_data = self.data_processor.process_input_data(df_loan_data)
+        df_loan_data = self.restore_processed_col_values(df_loan_data)
+        df_loan_data = self.scorer.restore_model_col_dtypes(df_loan_data)
+        scorable_row_mask = self.scorer.get_scorable_row_mask(df_loan_data).to_numpy()
+
+        loan_uptake_rates = np.full(len(df_loan_data), np.nan)
+        likelihood_categories = np.full(len(df_loan_data), None, dtype=object)
+        if scorable_row_mask.any():
+            df_loan_features = self.scorer.get_model_features(df_loan_data[scorable_row_mask])
+            loan_uptake_rates[scorable_row_mask] = self.scorer.get_uptake_rates(
+                self.predict_log_proba(df_loan_features))
+            likelihood_categories[scorable_row_mask] = self.scorer.get_categories_of_likelihood(
+                loan_uptake_rates[scorable_row_mask])
+
+        return [{'Client ID': self.get_result_client_id(client_id),
+                 'Scored': bool(scored_flag),
+                 'Uptake Rate': float(loan_uptake_rate) if scored_flag else None,
+                 'Likelihood Category': likelihood_category}
+                for client_id, scored_flag, loan_uptake_rate, likelihood_category
+                in zip(df_loan_data['ClientID'].tolist(), scorable_row_mask, loan_uptake_rates, likelihood_categories)]
+
+    def score_request_batch(self, scoring_request_list):
+        """
+        Public: Method to score the records of a batch of requests together, and hand each request its own results.
+        If the batch fails (the records that can't be cleaned are only flagged as not scored, so on an unexpected
+        error), each request is scored on its own, so that the error is only returned for the requests it comes from.
+        :param scoring_request_list: A list of tuples, each containing the raw records of a request and its future.
+        """
+        raw_record_list = [raw_record for request_record_list, _ in scoring_request_list
+                           for raw_record in request_record_list]
+        try:
+            result_list = self.score_raw_records(raw_record_list)
+        except Exception as error:
+            if len(scoring_request_list) == 1:
+                scoring_request_list[0][1].set_exception(error)
+                return
+            for request_record_list, request_future in scoring_request_list:
+                try:
+                    request_future.set_result(self.score_raw_records(request_record_list))
+                except Exception as request_error:
+                    request_future.set_exception(request_error)
+            return
+
+        with self.metrics_lock:
+            self.no_of_batches += 1
+            self.no_of_batched_records += len(raw_record_list)
+        result_start = 0
+        for request_record_list, request_future in scoring_request_list:
+            request_future.set_result(result_list[result_start:result_start + len(request_record_list)])
+            result_start += len(request_record_list)
+
+    def run_micro_batches(self):
+        """
+        Public: Method run by the batching thread. The requests that arrive within 'max_batch_wait_seconds' of the
+        first request of a batch (or queue up while the previous batch is scored) are scored together, up to
+        'max_batch_size' records per batch. The thread stops when it takes None from the request queue.
+        """
+        while True:
+            scoring_request = self.request_queue.get()
+            if scoring_request is None:
+                break
+            scoring_request_list = [scoring_request]
+            no_of_records = len(scoring_request[0])
+            batch_deadline = time.perf_counter() + self.max_batch_wait_seconds
+            while no_of_records < self.max_batch_size:
+                batch_wait_seconds = batch_deadline - time.perf_counter()
+                try:
+                    if batch_wait_seconds > 0:
+                        scoring_request = self.request_queue.get(timeout=batch_wait_seconds)
+                    else:
+                        scoring_request = self.request_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if scoring_request is None:
+                    # Score the batch collected so far, and stop afterwards.
+                    self.request_queue.put(None)
+                    break
+                scoring_request_list.append(scoring_request)
+                no_of_records += len(scoring_request[0])
+            self.score_request_batch(scoring_request_list)
+
+    def score_records(self, raw_record_list):
+        """
+        Public: Method to score the raw records of a request through the batching thread, and record the latency of
+        the request.
+        :param raw_record_list: A list of dictionary objects, each holding the raw columns of one client.
+        :return A list of dictionary objects containing the loan uptake rate and likelihood category of each record.
+        """
+        request_start_time = time.perf_counter()
+        request_future = Future()
+        self.request_queue.put((raw_record_list, request_future))
+        result_list = request_future.result()
+        with self.metrics_lock:
+            self.request_latency_list.append(time.perf_counter() - request_start_time)
+        return result_list
+
+    def get_latency_metrics(self):
+        """
+        Public: Method to report the latency percentiles (over the last 'SERVICE_LATENCY_WINDOW' requests) and the
+        batching figures of the service.
+        :return A dictionary object containing the metrics.
+        """
+        with self.metrics_lock:
+            request_latencies = np.array(self.request_latency_list) * 1000
+            no_of_batches = self.no_of_batches
+            no_of_batched_records = self.no_of_batched_records
+        latency_metrics = {"Requests": len(request_latencies),
+                           "P50LatencyMs": None,
+                           "P99LatencyMs": None,
+                           "Batches": no_of_batches,
+                           "MeanBatchSize": round(no_of_batched_records / no_of_batches, 3) if no_of_batches else None}
+        if len(request_latencies):
+            latency_metrics["P50LatencyMs"] = round(float(np.percentile(request_latencies, 50)), 3)
+            latency_metrics["P99LatencyMs"] = round(float(np.percentile(request_latencies, 99)), 3)
+        return latency_metrics
+
+    def start(self):
+        """
+        Public: Method to warm the service up and start the batching thread and the HTTP server (without serving the
+        requests yet).
+        """
+        self.warm_up()
+        self.batching_thread = threading.Thread(target=self.run_micro_batches, daemon=True)
+        self.batching_thread.start()
+        self.http_server = ThreadingHTTPServer((self.service_host, self.service_port),
+                                               LoanUptakeRatePredictionRequestHandler)
+        self.http_server.scoring_service = self
+
+    def stop(self):
+        """
+        Public: Method to close the HTTP server and stop the batching thread.
+        """
+        self.http_server.server_close()
+        self.request_queue.put(None)
+        self.batching_thread.join()
+
+    def execution_package(self):
+        """
+        Public: Method to run the scoring service until it is interrupted.
+        :return A boolean flag indicating whether the service ran or not.
+        """
+        self.start()
+        print("Serving loan likelihoods on http://{}:{}/score (metrics on /metrics)".format(
+            *self.http_server.server_address[:2]))
+        try:
+            self.http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+        return True
+
+
+class LoanUptakeRatePredictionRequestHandler(BaseHTTPRequestHandler):
+    # Keep the connections alive and send the responses without delay, so that a client scoring one record at a time
+    # doesn't pay for a new connection or wait on Nagle's algorithm per request.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        """
+        Public: Method to score a single raw record (a JSON object) or a list of raw records (a JSON list, or a JSON
+        object with the list under 'records') posted to /score.
+        """
+        if self.path != "/score":
+            self.send_json_response(404, {"Error": "Unknown path " + self.path})
+            return
+        try:
+            request_body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError as error:
+            self.send_json_response(400, {"Error": "Invalid JSON: " + str(error)})
+            return
+
+        single_record_flag = isinstance(request_body, dict) and 'records' not in request_body
+        if single_record_flag:
+            raw_record_list = [request_body]
+        elif isinstance(request_body, dict):
+            raw_record_list = request_body['records']
+        else:
+            raw_record_list = request_body
+        if not isinstance(raw_record_list, list) or len(raw_record_list) == 0 or \
+                not all(isinstance(raw_record, dict) for raw_record in raw_record_list):
+            self.send_json_response(400, {"Error": "Expected a raw record or a non-empty list of raw records"})
+            return
+
+        try:
+            result_list = self.server.scoring_service.score_records(raw_record_list)
+        except Exception as error:
+            self.send_json_response(422, {"Error": "Records couldn't be scored: {!r}".format(error)})
+            return
+        self.send_json_response(200, result_list[0] if single_record_flag else {"results": result_list})
+
+    def do_GET(self):
+        """
+        Public: Method to report the latency metrics of the service on /metrics.
+        """
+        if self.path != "/metrics":
+            self.send_json_response(404, {"Error": "Unknown path " + self.path})
+            return
+        self.send_json_response(200, self.server.scoring_service.get_latency_metrics())
+
+    def send_json_response(self, status_code, response_body):
+        """
+        Public: Method to send a JSON response.
+        :param status_code: The HTTP status code of the response.
+        :param response_body: A JSON serializable object.
+        """
+        response_content = json.dumps(response_body, allow_nan=False).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response_content)))
+        self.end_headers()
+        self.wfile.write(response_content)
+
+    def log_message(self, format, *args):
+        # Logging every request to stderr would cost more than scoring a record.
+        pass
+
+
+if __name__ == "__main__":
+    obj_service = LoanUptakeRatePredictionService()
+    success_flag = obj_service.execution_package()
+    if not success_flag:
+        print("Service couldn't be started.")
@@ -0,0 +1,237 @@
+# Import the required libraries
+import os
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+import config as cfg
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.utils import resample
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer
+from sklearn.compose import ColumnTransformer
+from sklearn.metrics import accuracy_score
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_selection import SelectFromModel
+from sklearn.preprocessing import OneHotEncoder, MinMaxScaler
+from sklearn.model_selection import train_test_split, StratifiedKFold, ParameterGrid
+from LoanUptakeRatePredictionScorer import LoanUptakeRatePredictionScorer
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+
+class LoanUptakeRatePredictionTrainer:
+
+    def __init__(self):
+        self.model_file = cfg.LOAN_LIKELIHOOD_MODEL_FILE
+        self.training_data_file = cfg.TRAINING_DATA_FILE_NAME
+        self.validation_size = cfg.TRAINING_VALIDATION_SIZE
+        self.cv_folds = cfg.TRAINING_CV_FOLDS
+        self.parameter_grid = cfg.TRAINING_PARAMETER_GRID
+        self.feature_selection_trees = cfg.TRAINING_FEATURE_SELECTION_TREES
+        self.random_seed = cfg.TRAINING_RANDOM_SEED
+        self.training_workers = cfg.TRAINING_WORKERS
+        self.scorer = LoanUptakeRatePredictionScorer()
+
+    def load_training_data(self, training_data_file):
+        """
+        Public: Method to load the processed training data (in the CSV, parquet or feather format) with the column
+        dtypes the model is trained with, dropping the noise (the Client IDs, and the rows with the County value
+        "Outside ROI" or an unknown (-1) LoanHeldBefore value).
+        :param training_data_file: Name of the file containing the processed training data.
+        :return A pandas dataframe object containing the training data.
+        """
+        df_loan_data = pd.concat(self.scorer.load_processed_data_batches(training_data_file), ignore_index=True)
+        df_loan_data = self.scorer.restore_model_col_dtypes(df_loan_data)
+        df_loan_data = df_loan_data[self.scorer.get_scorable_row_mask(df_loan_data)]
+        return df_loan_data.drop(columns=['ClientID']).reset_index(drop=True)
+
+    def get_balanced_positions(self, loan_flags):
+        """
+        Public: Method to balance the classes of the 'LoanFlag' target variable, by oversampling the minority class
+        (with replacement) up to the size of the majority class. Only the row positions are sampled, so the feature
+        data isn't copied: the rows are picked from the training data by each fit, as they are needed.
+        :param loan_flags: A numpy array containing the loan flag of each row of the training data.
+        :return A numpy array containing the row positions of the balanced training data (the majority class rows,
+        followed by the oversampled minority class rows).
+        """
+        majority_class_positions = np.flatnonzero(loan_flags == 0)
+        minority_class_positions = np.flatnonzero(loan_flags == 1)
+        minority_class_positions_upsampled = resample(minority_class_positions, replace=True,
+                                                      n_samples=majority_class_positions.shape[0],
+                                                      random_state=self.random_seed)
+        return np.concatenate([majority_class_positions, minority_class_positions_upsampled])
+
+    def build_loan_data_pipeline(self, df_loan_features):
+        """
+        Public: Method to build the model pipeline: the numeric features are imputed (mean) and scaled, the category
+        features (object columns) are imputed ('Unknown') and one-hot encoded, the features are selected on the
+        importances of a random forest, and the loan flag is predicted by a logistic regression.
+        :param df_loan_features: A pandas dataframe object containing the features.
+        :return The (unfitted) model pipeline.
+        """
+        numeric_features = df_loan_features.select_dtypes(include=['int64', 'float64']).columns
+        categorical_features = df_loan_features.select_dtypes(include=['object']).columns
+        num_col_transformer = Pipeline(steps=[('imputer', SimpleImputer(strategy='mean')),
+                                              ('scaler', MinMaxScaler())])
+        categ_col_transformer = Pipeline(steps=[('imputer', SimpleImputer(strategy='constant', fill_value='Unknown')),
+                                                ('onehot', OneHotEncoder(handle_unknown='ignore'))])
+        loan_data_preprocessor = ColumnTransformer(transformers=[('num', num_col_transformer, numeric_features),
+                                                                 ('cat', categ_col_transformer, categorical_features)])
+        loan_data_feature_selector = SelectFromModel(RandomForestClassifier(n_estimators=self.feature_selection_trees,
+                                                                            random_state=self.random_seed))
+        return Pipeline(steps=[('preprocessor', loan_data_preprocessor),
+                               ('feat_select', loan_data_feature_selector),
+                               ('classifier', LogisticRegression(random_state=self.random_seed))])
+
+    def prepare_fold_features(self, feature_pipeline, df_train_features, train_labels, df_test_features):
+        """
+        Public: Method to fit the feature steps of the pipeline (preprocessing and feature selection) on the training
+        part of a fold, and transform both parts of the fold. The result is reused by every candidate classifier.
+        :param feature_pipeline: The (unfitted) pipeline of the feature steps.
+        :param df_train_features: A pandas dataframe object containing the features of the training part.
+        :param train_labels: A numpy array containing the loan flags of the training part.
+        :param df_test_features: A pandas dataframe object containing the features of the held out part (or None).
+        :return A tuple containing the fitted feature pipeline and the transformed features of both parts.
+        """
+        feature_pipeline = clone(feature_pipeline)
+        train_features = feature_pipeline.fit_transform(df_train_features, train_labels)
+        test_features = feature_pipeline.transform(df_test_features) if df_test_features is not None else None
+        return feature_pipeline, train_features, test_features
+
+    def get_classifier(self, candidate_params):
+        """
+        Public: Method to get a classifier with a candidate set of parameters from the grid.
+        :param candidate_params: A dictionary object mapping the pipeline parameter names ('classifier__<name>') to
+        their values.
+        :return The (unfitted) classifier.
+        """
+        classifier_params = {param_name.split('__', 1)[1]: param_value
+                             for param_name, param_value in candidate_params.items()}
+        return LogisticRegression(random_state=self.random_seed).set_params(**classifier_params)
+
+    def score_candidate_fold(self, candidate_params, train_features, train_labels, test_features, test_labels):
+        """
+        Public: Method to fit a candidate classifier on the transformed training part of a fold, and score its
+        accuracy on the held out part.
+        :param candidate_params: A dictionary object containing the candidate parameters of the classifier.
+        :param train_features: The transformed features of the training part.
+        :param train_labels: A numpy array containing the loan flags of the training part.
+        :param test_features: The transformed features of the held out part.
+        :param test_labels: A numpy array containing the loan flags of the held out part.
+        :return The accuracy of the candidate on the held out part.
+        """
+        fold_classifier = self.get_classifier(candidate_params).fit(train_features, train_labels)
+        return accuracy_score(test_labels, fold_classifier.predict(test_features))
+
+    def run_grid_search(self, loan_data_pipeline, df_loan_features, loan_flags, train_positions):
+        """
+        Public: Method to cross-validate the default classifier and every candidate of 'parameter_grid' on the same
+        stratified folds, and refit the pipeline with the best candidate on all the training rows. Only the classifier
+        parameters are searched, so the feature steps (with their 200-tree random forest) are fitted once per fold and
+        once on all the training rows, on the worker pool, instead of once per fold and candidate. The candidates are
+        then fitted and scored on every fold on the worker pool as well. The rows of a fold are only picked from the
+        training data when the fold is sent to a worker.
+        :param loan_data_pipeline: The (unfitted) model pipeline.
+        :param df_loan_features: A pandas dataframe object containing the features of the training data.
+        :param loan_flags: A numpy array containing the loan flag of each row of the training data.
+        :param train_positions: A numpy array containing the row positions (of the balanced data) to train on.
+        :return A tuple containing the fitted pipeline with the best candidate and a pandas dataframe object with the
+        cross-validated accuracy of each candidate.
+        """
+        feature_pipeline = Pipeline(loan_data_pipeline.steps[:-1])
+        fold_position_list = [(train_positions[fold_train_positions], train_positions[fold_test_positions])
+                              for fold_train_positions, fold_test_positions in
+                              StratifiedKFold(n_splits=self.cv_folds).split(train_positions,
+                                                                            loan_flags[train_positions])]
+        with Parallel(n_jobs=self.training_workers) as parallel_pool:
+            # The feature steps fitted on all the training rows (for the refit) are prepared along with the folds.
+            *fold_feature_list, (fitted_feature_pipeline, train_features, _) = parallel_pool(
+                delayed(self.prepare_fold_features)(feature_pipeline, df_loan_features.iloc[fit_positions],
+                                                    loan_flags[fit_positions],
+                                                    None if test_positions is None else
+                                                    df_loan_features.iloc[test_positions])
+                for fit_positions, test_positions in fold_position_list + [(train_positions, None)])
+
+            # The default classifier (as built in the pipeline) is scored first, then each candidate of the grid.
+            candidate_params_list = [{}] + list(ParameterGrid(self.parameter_grid))
+            fold_score_list = parallel_pool(
+                delayed(self.score_candidate_fold)(candidate_params, fold_train_features, loan_flags[fit_positions],
+                                                   fold_test_features, loan_flags[test_positions])
+                for candidate_params in candidate_params_list
+                for (_, fold_train_features, fold_test_features), (fit_positions, test_positions)
+                in zip(fold_feature_list, fold_position_list))
+
+        fold_scores = np.array(fold_score_list).reshape(len(candidate_params_list), self.cv_folds)
+        df_cv_results = pd.DataFrame({'Candidate': ['default'] + [str(candidate_params)
+                                                                  for candidate_params in candidate_params_list[1:]],
+                                      'MeanAccuracy': np.round(fold_scores.mean(axis=1) * 100, 3),
+                                      'StdAccuracy': np.round(fold_scores.std(axis=1) * 100, 3)})
+
+        # As in a grid search, the first of the best scoring candidates of the grid is refitted.
+        best_params = candidate_params_list[1 + int(np.argmax(fold_scores[1:].mean(axis=1)))]
+        best_classifier = self.get_classifier(best_params).fit(train_features, loan_flags[train_positions])
+        tuned_loan_data_pipeline = Pipeline(fitted_feature_pipeline.steps + [('classifier', best_classifier)])
+        return tuned_loan_data_pipeline, df_cv_results
+
+    def get_validation_accuracy(self, loan_data_pipeline, df_loan_features, loan_flags, val_positions):
+        """
+        Public: Method to score the accuracy of the fitted pipeline on the rows held out for validation, picking them
+        from the training data 'scoring_batch_size' rows at a time.
+        :param loan_data_pipeline: The fitted model pipeline.
+        :param df_loan_features: A pandas dataframe object containing the features of the training data.
+        :param loan_flags: A numpy array containing the loan flag of each row of the training data.
+        :param val_positions: A numpy array containing the row positions (of the balanced data) held out.
+        :return The accuracy of the pipeline on the validation rows.
+        """
+        batch_size = self.scorer.scoring_batch_size
+        no_of_correct_predictions = 0
+        for batch_start in range(0, len(val_positions), batch_size):
+            batch_positions = val_positions[batch_start:batch_start + batch_size]
+            val_predictions = loan_data_pipeline.predict(df_loan_features.iloc[batch_positions])
+            no_of_correct_predictions += int((val_predictions == loan_flags[batch_positions]).sum())
+        return no_of_correct_predictions / len(val_positions)
+
+    def save_model(self, loan_data_pipeline, model_file):
+        """
+        Public: Method to save the fitted model pipeline (with joblib) for scoring.
+        :param loan_data_pipeline: The fitted model pipeline.
+        :param model_file: Name of the model file.
+        """
+        os.makedirs(os.path.dirname(model_file), exist_ok=True)
+        joblib.dump(loan_data_pipeline, model_file)
+
+    def execution_package(self):
+        """
+        Public: Method to train the model on the processed training data: the classes are balanced, a share of the data
+        is held out for validation, the classifier parameters are tuned with cross-validation on the rest, and the
+        tuned pipeline is saved into the model file used for scoring.
+        :return A boolean flag indicating whether the model file was generated or not.
+        """
+        df_loan_features = self.load_training_data(self.training_data_file)
+        loan_flags = df_loan_features.pop('LoanFlag').to_numpy()
+        train_positions, val_positions = train_test_split(self.get_balanced_positions(loan_flags),
+                                                          test_size=self.validation_size, random_state=self.random_seed)
+
+        loan_data_pipeline = self.build_loan_data_pipeline(df_loan_features)
+        tuned_loan_data_pipeline, df_cv_results = self.run_grid_search(loan_data_pipeline, df_loan_features,
+                                                                       loan_flags, train_positions)
+        print("Model Accuracy after Cross Validation ({} folds):".format(self.cv_folds))
+        print(df_cv_results.to_string(index=False))
+        model_accuracy_score = round(self.get_validation_accuracy(tuned_loan_data_pipeline, df_loan_features,
+                                                                  loan_flags, val_positions) * 100, 3)
+        print("Tuned Model Accuracy on the validation data: ", model_accuracy_score, "%")
+
+        self.save_model(tuned_loan_data_pipeline, self.model_file)
+        return os.path.exists(self.model_file)
+
+
+if __name__ == "__main__":
+    obj_trainer = LoanUptakeRatePredictionTrainer()
+    success_flag = obj_trainer.execution_package()
+    if success_flag:
+        print("Successfully trained and saved the loan likelihood model.")
+    else:
+        print("Model file couldn't be generated.")
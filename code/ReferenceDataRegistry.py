@@ -0,0 +1,118 @@
+# Import the required libraries
+import io
+import os
+import hashlib
+import threading
+import pandas as pd
+
+# The registries shared by everything running in this process, one per encoding format
+shared_registry_dict = {}
+
+
+def get_reference_data_registry(encoding_format):
+    """
+    Public: Function to get the reference data registry shared by everything running in this process.
+    :param encoding_format: Encoding format of the reference data files.
+    :return A ReferenceDataRegistry object.
+    """
+    if encoding_format not in shared_registry_dict:
+        shared_registry_dict[encoding_format] = ReferenceDataRegistry(encoding_format)
+    return shared_registry_dict[encoding_format]
+
+
+class ReferenceDataRegistry:
+
+    def __init__(self, encoding_format):
+        self.encoding_format = encoding_format
+        self.reference_data_dict = {}
+        self.content_hash_dict = {}
+        self.reference_data_lock = threading.Lock()
+
+    def __reduce__(self):
+        # Only a reference to the registry is pickled: every process (e.g. a worker process) unpickles it into its own
+        # shared registry, so the lookups are never sent along with the tasks.
+        return get_reference_data_registry, (self.encoding_format,)
+
+    def get_file_version(self, reference_data_file):
+        """
+        Public: Method to get the key of a reference data file in the registry and the version (size & modification
+        time) of the file.
+        :param reference_data_file: Name of the reference data file.
+        :return A tuple containing the key and the version of the file.
+        """
+        file_stat = os.stat(reference_data_file)
+        return os.path.abspath(reference_data_file), (file_stat.st_size, file_stat.st_mtime_ns)
+
+    def load_reference_data(self, reference_data_file, lookup_name, build_lookup):
+        """
+        Public: Method to load a reference data file (once per version of the file) and build its lookup. The file is
+        read in one go, hashed and parsed into a dictionary object mapping its first column to its second column.
+        :param reference_data_file: Name of the CSV file containing the reference data.
+        :param lookup_name: Name of the lookup built from the file.
+        :param build_lookup: Function building the lookup from the dictionary object.
+        :return The lookup built from the file.
+        """
+        reference_data_key, file_version = self.get_file_version(reference_data_file)
+        with self.reference_data_lock:
+            lookup_entry = self.reference_data_dict.get((reference_data_key, lookup_name))
+            if lookup_entry is None or lookup_entry[0] != file_version:
+                with open(reference_data_file, 'rb') as input_file:
+                    file_content = input_file.read()
+                self.content_hash_dict[reference_data_key] = (file_version, hashlib.sha256(file_content).hexdigest())
+                df_reference_data = pd.read_csv(io.BytesIO(file_content), encoding=self.encoding_format)
+                lookup_entry = (file_version, build_lookup(dict(zip(df_reference_data[df_reference_data.columns[0]],
+                                                                    df_reference_data[df_reference_data.columns[1]]))))
+                self.reference_data_dict[(reference_data_key, lookup_name)] = lookup_entry
+            return lookup_entry[1]
+
+    def get_content_hash(self, reference_data_file):
+        """
+        Public: Method to get the hash of the content of a reference data file (computed once per version of the file).
+        :param reference_data_file: Name of the reference data file.
+        :return The hex digest of the SHA-256 hash of the file content.
+        """
+        reference_data_key, file_version = self.get_file_version(reference_data_file)
+        with self.reference_data_lock:
+            content_hash_entry = self.content_hash_dict.get(reference_data_key)
+            if content_hash_entry is None or content_hash_entry[0] != file_version:
+                with open(reference_data_file, 'rb') as input_file:
+                    content_hash_entry = (file_version, hashlib.sha256(input_file.read()).hexdigest())
+                self.content_hash_dict[reference_data_key] = content_hash_entry
+            return content_hash_entry[1]
+
+    def get_county_lookup(self, county_town_data_file):
+        """
+        Public: Method to get the county lookup, i.e. the town to county dictionary and the set of county names.
+        :param county_town_data_file: Name of the CSV file containing the towns and counties.
+        :return A tuple containing the town to county dictionary and the (frozen) set of county names.
+        """
+        county_lookup = self.load_reference_data(
+            county_town_data_file, "county", lambda county_town_data_dict: (county_town_data_dict,
+                                                                            frozenset(county_town_data_dict.values())))
+        return county_lookup
+
+    def get_merchant_category_lookup(self, merchant_category_data_file):
+        """
+        Public: Method to get the merchant category lookup, which includes the 'Unknown' category for the code 0 (the
+        code of the missing merchant categories).
+        :param merchant_category_data_file: Name of the CSV file containing the merchant codes and categories.
+        :return A pandas series object mapping the merchant codes to the merchant categories.
+        """
+        def build_merchant_category_lookup(merchant_category_data_dict):
+            merchant_category_data_dict[0] = "Unknown"
+            return pd.Series(merchant_category_data_dict)
+
+        merchant_category_lookup = self.load_reference_data(merchant_category_data_file, "merchant_category",
+                                                            build_merchant_category_lookup)
+        return merchant_category_lookup
+
+    def get_version_hash(self, reference_data_file_list):
+        """
+        Public: Method to compute the version hash of the reference data, so that the results can be tied to the
+        reference data they were produced with.
+        :param reference_data_file_list: A list containing the names of the reference data files.
+        :return The hex digest of the SHA-256 hash of the content hashes of the files.
+        """
+        content_hash_list = [self.get_content_hash(reference_data_file)
+                             for reference_data_file in reference_data_file_list]
+        return hashlib.sha256("\n".join(content_hash_list).encode('utf-8')).hexdigest()
@@ -0,0 +1,244 @@
+# Import the required libraries
+import os
+import sys
+import json
+import time
+import ctypes
+import cProfile
+import datetime
+import tracemalloc
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # The peak memory of the process isn't available on this platform (e.g. Windows), and isn't reported.
+    resource = None
+
+
+class StageInstrumentation:
+
+    def __init__(self, profiled_stage_name=None):
+        self.profiled_stage_name = profiled_stage_name
+        self.stage_profiler = None
+        self.data_set_name = None
+        self.stage_record_dict = {}
+        self.run_start_time = None
+        self.run_start_datetime = None
+        # The memory the stage peaks are measured on: the resident set size of the process (Linux, whose peak can be
+        # reset before each stage) or else the allocations traced by tracemalloc.
+        self.memory_source = None
+        # Peak memory of the process before the last reset of its peak (the peak of the run so far)
+        self.process_peak_memory = 0
+        # Peak memory reached by the nested stages of each running stage (each of them resets the peak)
+        self.stage_peak_memory_stack = []
+        self.malloc_trim = None
+
+    def get_peak_memory_bytes(self):
+        """
+        Public: Method to get the peak memory (maximum resident set size) of the process so far.
+        :return The peak memory in bytes, or None when it isn't available on this platform.
+        """
+        if self.memory_source == "ResidentSetSize":
+            # Resetting the peak of the resident set size resets the one reported by getrusage() as well.
+            return max(self.process_peak_memory, self.read_process_status_bytes("VmHWM") or 0)
+        if resource is None:
+            return None
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports the peak memory in kilobytes, macOS in bytes.
+        return peak_memory if sys.platform == "darwin" else peak_memory * 1024
+
+    def read_process_status_bytes(self, status_field_name):
+        """
+        Public: Method to read a memory figure of the process (e.g. 'VmRSS', the current resident set size, or 'VmHWM',
+        its peak) from /proc/self/status.
+        :param status_field_name: Name of the status field.
+        :return The memory in bytes, or None when it isn't available on this platform.
+        """
+        try:
+            with open("/proc/self/status") as status_file:
+                for status_line in status_file:
+                    if status_line.startswith(status_field_name + ":"):
+                        return int(status_line.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+    def reset_resident_set_peak(self):
+        """
+        Public: Method to reset the peak resident set size of the process to its current value (through
+        /proc/self/clear_refs), keeping the peak reached so far for the run report. The memory freed by the earlier
+        stages is handed back to the system first (with glibc's malloc_trim), as it would otherwise stay resident and
+        be reused without raising the resident set size of the next stages.
+        :return A boolean flag indicating whether the peak was reset or not.
+        """
+        peak_memory = self.read_process_status_bytes("VmHWM")
+        if peak_memory is None:
+            return False
+        if self.malloc_trim is None:
+            self.malloc_trim = getattr(ctypes.CDLL(None), 'malloc_trim', False)
+        if self.malloc_trim:
+            self.malloc_trim(0)
+        try:
+            with open("/proc/self/clear_refs", 'w') as clear_refs_file:
+                clear_refs_file.write("5")
+        except OSError:
+            return False
+        self.process_peak_memory = max(self.process_peak_memory, peak_memory)
+        return True
+
+    def start_stage_memory_measurement(self):
+        """
+        Public: Method to reset the peak memory before a stage runs, so that the peak reached by the stage itself can
+        be read once it's done.
+        :return The current memory in bytes, or None when the memory isn't measured.
+        """
+        if self.memory_source == "ResidentSetSize":
+            self.reset_resident_set_peak()
+            return self.read_process_status_bytes("VmRSS")
+        if self.memory_source == "TracedAllocations":
+            tracemalloc.reset_peak()
+            return tracemalloc.get_traced_memory()[0]
+        return None
+
+    def get_stage_peak_memory_bytes(self):
+        """
+        Public: Method to get the peak memory since the last reset (see start_stage_memory_measurement).
+        :return The peak memory in bytes, or None when the memory isn't measured.
+        """
+        if self.memory_source == "ResidentSetSize":
+            return self.read_process_status_bytes("VmHWM")
+        if self.memory_source == "TracedAllocations":
+            return tracemalloc.get_traced_memory()[1]
+        return None
+
+    def get_no_of_rows(self, stage_data):
+        """
+        Public: Method to count the rows of the input or the result of a stage.
+        :param stage_data: A pandas dataframe object, a list of them, or the number of rows (e.g. rows written).
+        :return The number of rows, or None when the data isn't made of rows (e.g. a list of file names).
+        """
+        if isinstance(stage_data, pd.DataFrame):
+            return len(stage_data)
+        if isinstance(stage_data, list) and stage_data and \
+                all(isinstance(df_data, pd.DataFrame) for df_data in stage_data):
+            return sum(len(df_data) for df_data in stage_data)
+        if isinstance(stage_data, int) and not isinstance(stage_data, bool):
+            return stage_data
+        return None
+
+    def start_run(self):
+        """
+        Public: Method to start recording a run (the records of any earlier run are dropped).
+        """
+        self.stage_record_dict = {}
+        self.stage_profiler = None
+        self.process_peak_memory = 0
+        self.stage_peak_memory_stack = []
+        if self.memory_source is None:
+            if self.reset_resident_set_peak():
+                self.memory_source = "ResidentSetSize"
+            else:
+                # Tracing the allocations slows the stages down, and is only done when the run report is enabled.
+                tracemalloc.start()
+                self.memory_source = "TracedAllocations"
+        self.run_start_time = time.perf_counter()
+        self.run_start_datetime = datetime.datetime.now()
+
+    def run_stage(self, stage_name, stage_method, *stage_args):
+        """
+        Public: Method to run a stage and record its elapsed time, rows in and out and peak memory (how far the memory
+        rose above what it was when the stage started). The calls of a stage on the same data set (e.g. on each chunk
+        when streaming) are added up into one record, which keeps the highest peak memory of the calls. The stage named
+        'profiled_stage_name' is run under cProfile.
+        :param stage_name: Name of the stage.
+        :param stage_method: The method running the stage.
+        :param stage_args: The arguments of the stage method; the first one is taken as the input of the stage.
+        :return The result of the stage.
+        """
+        rows_in = self.get_no_of_rows(stage_args[0]) if stage_args else None
+        if self.stage_peak_memory_stack:
+            # The peak the running stage reached so far is kept before this (nested) stage resets it.
+            self.stage_peak_memory_stack[-1] = max(self.stage_peak_memory_stack[-1],
+                                                   self.get_stage_peak_memory_bytes() or 0)
+        memory_before = self.start_stage_memory_measurement()
+        self.stage_peak_memory_stack.append(0)
+        try:
+            if stage_name == self.profiled_stage_name:
+                if self.stage_profiler is None:
+                    self.stage_profiler = cProfile.Profile()
+                stage_start_time = time.perf_counter()
+                self.stage_profiler.enable()
+                try:
+                    stage_result = stage_method(*stage_args)
+                finally:
+                    self.stage_profiler.disable()
+            else:
+                stage_start_time = time.perf_counter()
+                stage_result = stage_method(*stage_args)
+            elapsed_seconds = time.perf_counter() - stage_start_time
+        finally:
+            nested_stage_peak_memory = self.stage_peak_memory_stack.pop()
+        stage_peak_memory = self.get_stage_peak_memory_bytes()
+        if stage_peak_memory is not None:
+            # A nested stage resets the peak memory, so the peaks reached before it reset it are added back.
+            stage_peak_memory = max(stage_peak_memory, nested_stage_peak_memory)
+            if self.stage_peak_memory_stack:
+                self.stage_peak_memory_stack[-1] = max(self.stage_peak_memory_stack[-1], stage_peak_memory)
+
+        stage_record = self.stage_record_dict.setdefault((self.data_set_name, stage_name), {
+            "DataSet": self.data_set_name, "Stage": stage_name, "Calls": 0, "ElapsedSeconds": 0.0, "RowsIn": None,
+            "RowsOut": None, "RowsPerSecond": None, "PeakMemoryBytes": None})
+        stage_record["Calls"] += 1
+        stage_record["ElapsedSeconds"] += elapsed_seconds
+        rows_out = self.get_no_of_rows(stage_result)
+        if rows_in is not None:
+            stage_record["RowsIn"] = (stage_record["RowsIn"] or 0) + rows_in
+        if rows_out is not None:
+            stage_record["RowsOut"] = (stage_record["RowsOut"] or 0) + rows_out
+        if stage_peak_memory is not None and memory_before is not None:
+            stage_record["PeakMemoryBytes"] = max(stage_record["PeakMemoryBytes"] or 0,
+                                                  stage_peak_memory - memory_before)
+        return stage_result
+
+    def get_run_report(self):
+        """
+        Public: Method to generate the report of the run, with a record per stage and data set in the order the stages
+        first ran. The throughput of a stage is given in rows out (or rows in, for the stages only consuming rows, e.g.
+        writing) per second.
+        :return A dictionary object containing the run report.
+        """
+        stage_record_list = []
+        for stage_record in self.stage_record_dict.values():
+            stage_record = dict(stage_record)
+            no_of_rows = stage_record["RowsOut"] if stage_record["RowsOut"] is not None else stage_record["RowsIn"]
+            if no_of_rows is not None and stage_record["ElapsedSeconds"] > 0:
+                stage_record["RowsPerSecond"] = round(no_of_rows / stage_record["ElapsedSeconds"], 1)
+            stage_record["ElapsedSeconds"] = round(stage_record["ElapsedSeconds"], 6)
+            stage_record_list.append(stage_record)
+        return {"Started": self.run_start_datetime.isoformat(timespec='seconds'),
+                "ElapsedSeconds": round(time.perf_counter() - self.run_start_time, 6),
+                "PeakMemoryBytes": self.get_peak_memory_bytes(),
+                "MemorySource": self.memory_source,
+                "ProfiledStage": self.profiled_stage_name,
+                "Stages": stage_record_list}
+
+    def write_run_report(self, run_report_file, report_section_dict=None):
+        """
+        Public: Method to write the run report into a JSON file. When a stage was profiled, its profile is written next
+        to the report (with the name of the stage and the '.prof' extension), to be read with pstats or snakeviz.
+        :param run_report_file: Name of the JSON file.
+        :param report_section_dict: A dictionary object containing further sections of the report (e.g. the rows
+        dropped by the joins), keyed by section name.
+        :return A dictionary object containing the run report.
+        """
+        run_report = self.get_run_report()
+        run_report.update(report_section_dict or {})
+        os.makedirs(os.path.dirname(run_report_file), exist_ok=True)
+        if self.stage_profiler is not None:
+            run_report["ProfileFile"] = os.path.join(os.path.dirname(run_report_file),
+                                                     self.profiled_stage_name + ".prof")
+            self.stage_profiler.dump_stats(run_report["ProfileFile"])
+        with open(run_report_file, 'w') as output_file:
+            json.dump(run_report, output_file, indent=2)
+        return run_report
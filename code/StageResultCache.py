@@ -0,0 +1,97 @@
+# Import the required libraries
+import os
+import hashlib
+import pandas as pd
+
+
+class StageResultCache:
+
+    def __init__(self, cache_dir, max_cache_size_bytes, force_rebuild=False):
+        self.cache_dir = cache_dir
+        self.max_cache_size_bytes = max_cache_size_bytes
+        self.force_rebuild = force_rebuild
+        self.file_content_hash_dict = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_file_content_hash(self, file_name):
+        """
+        Public: Method to compute the hash of the content of a file. The hash is computed once per process for each
+        version (size & modification time) of the file.
+        :param file_name: Name of the file.
+        :return The hex digest of the SHA-256 hash of the file content.
+        """
+        file_stat = os.stat(file_name)
+        file_version = (os.path.abspath(file_name), file_stat.st_size, file_stat.st_mtime_ns)
+        if file_version not in self.file_content_hash_dict:
+            content_hash = hashlib.sha256()
+            with open(file_name, 'rb') as input_file:
+                for file_block in iter(lambda: input_file.read(1024 * 1024), b''):
+                    content_hash.update(file_block)
+            self.file_content_hash_dict[file_version] = content_hash.hexdigest()
+        return self.file_content_hash_dict[file_version]
+
+    def get_stage_key(self, *key_parts):
+        """
+        Public: Method to compute the cache key of a stage from the parts identifying its result (e.g. the key of the
+        previous stage, the name of the stage, the hashes of the files it reads and the config values it depends on).
+        :param key_parts: The parts identifying the result of the stage (their repr() is hashed).
+        :return The hex digest of the SHA-256 hash of the key parts.
+        """
+        return hashlib.sha256(repr(key_parts).encode('utf-8')).hexdigest()
+
+    def get_cache_file_name(self, stage_key):
+        """
+        Public: Method to get the name of the file holding the cached result of a stage.
+        :param stage_key: The cache key of the stage.
+        :return The name of the cache file.
+        """
+        return os.path.join(self.cache_dir, stage_key + ".pkl")
+
+    def contains(self, stage_key):
+        """
+        Public: Method to check whether the result of a stage is cached (always False when a rebuild is forced).
+        :param stage_key: The cache key of the stage.
+        :return A boolean flag indicating whether the result can be loaded from the cache.
+        """
+        return not self.force_rebuild and os.path.exists(self.get_cache_file_name(stage_key))
+
+    def load(self, stage_key):
+        """
+        Public: Method to load the cached result of a stage. The cache file is touched, so that the least recently
+        used results are evicted first.
+        :param stage_key: The cache key of the stage.
+        :return The cached result of the stage.
+        """
+        cache_file_name = self.get_cache_file_name(stage_key)
+        os.utime(cache_file_name)
+        return pd.read_pickle(cache_file_name)
+
+    def store(self, stage_key, stage_result):
+        """
+        Public: Method to store the result of a stage in the cache, and then evict the least recently used results
+        until the cache fits in 'max_cache_size_bytes'.
+        :param stage_key: The cache key of the stage.
+        :param stage_result: The result of the stage (any picklable object, e.g. a pandas dataframe object).
+        """
+        cache_file_name = self.get_cache_file_name(stage_key)
+        # Write to a temporary file first, so that an interrupted write never leaves a partial cache file behind.
+        pd.to_pickle(stage_result, cache_file_name + ".tmp")
+        os.replace(cache_file_name + ".tmp", cache_file_name)
+        self.evict()
+
+    def evict(self):
+        """
+        Public: Method to delete the least recently used cache files until the total size of the cache fits in
+        'max_cache_size_bytes'.
+        """
+        cache_file_list = [os.path.join(self.cache_dir, file_name) for file_name in os.listdir(self.cache_dir)
+                           if file_name.endswith(".pkl")]
+        cache_file_stat_list = sorted([(os.stat(cache_file_name), cache_file_name)
+                                       for cache_file_name in cache_file_list],
+                                      key=lambda cache_file_stat: cache_file_stat[0].st_mtime_ns)
+        cache_size_bytes = sum(file_stat.st_size for file_stat, _ in cache_file_stat_list)
+        for file_stat, cache_file_name in cache_file_stat_list:
+            if cache_size_bytes <= self.max_cache_size_bytes:
+                break
+            os.remove(cache_file_name)
+            cache_size_bytes -= file_stat.st_size
@@ -0,0 +1,271 @@
+# Import the required libraries
+import os
+import numpy as np
+import pandas as pd
+import config as cfg
+from ReferenceDataRegistry import get_reference_data_registry
+
+
+class SyntheticLoanDataGenerator:
+
+    def __init__(self, no_of_clients):
+        self.no_of_clients = no_of_clients
+        self.random_seed = cfg.BENCHMARK_RANDOM_SEED
+        self.dirty_value_rate = cfg.BENCHMARK_DIRTY_VALUE_RATE
+        self.generation_chunk_size = cfg.BENCHMARK_GENERATION_CHUNK_SIZE
+        self.encoding_format = cfg.ENCODING_FORMAT
+        self.raw_data_dir = cfg.RAW_DATA_DIR
+        self.raw_training_data_file_list = cfg.RAW_TRAINING_DATA_FILE_LIST
+        self.raw_test_data_file_list = cfg.RAW_TEST_DATA_FILE_LIST
+        self.raw_demographic_data_col_list = list(cfg.RAW_DEMOGRAPHIC_DATA_COL_DICT)
+        self.raw_prev_loan_data_col_list = list(cfg.RAW_PREVIOUS_LOAN_DATA_COL_DICT)
+        self.raw_prods_held_data_col_list = list(cfg.RAW_PRODUCTS_HELD_DATA_COL_DICT)
+        self.raw_avg_txn_amt_data_col_list = list(cfg.RAW_AVG_TXN_AMOUNT_DATA_COL_DICT)
+        self.raw_txn_details_data_col_list = list(cfg.RAW_TXN_DETAILS_DATA_COL_DICT)
+        self.raw_loan_flag_data_col_list = list(cfg.RAW_TARGET_VARIABLE_DATA_COL_DICT)
+        reference_data_registry = get_reference_data_registry(self.encoding_format)
+        county_town_data_dict, county_name_set = reference_data_registry.get_county_lookup(
+            cfg.EXT_COUNTY_TOWN_DATA_FILE)
+        self.town_name_list = sorted(county_town_data_dict)
+        self.county_name_list = sorted(county_name for county_name in county_name_set if "/" not in county_name)
+        merchant_category_lookup = reference_data_registry.get_merchant_category_lookup(
+            cfg.EXT_MERCHANT_CATEGORY_DATA_FILE)
+        self.merchant_code_list = sorted(merchant_code for merchant_code in merchant_category_lookup.index
+                                         if merchant_code != 0)
+        self.random_generator = None
+
+    def get_raw_data_file_lists(self, output_dir):
+        """
+        Public: Method to get the names of the raw data files under the output directory, laid out as the raw data
+        files listed in config.py are laid out under RAW_DATA_DIR.
+        :param output_dir: Name of the directory to hold the raw data files.
+        :return A tuple containing the list of training data files and the list of testing data files.
+        """
+        return tuple([os.path.join(output_dir, os.path.relpath(raw_data_file, self.raw_data_dir))
+                      for raw_data_file in raw_data_file_list]
+                     for raw_data_file_list in [self.raw_training_data_file_list, self.raw_test_data_file_list])
+
+    def get_dirty_value_mask(self, no_of_values):
+        """
+        Public: Method to pick the values to be replaced with dirty values, at the rate of 'dirty_value_rate'.
+        :param no_of_values: The number of values.
+        :return A boolean numpy array, True for the values to be replaced.
+        """
+        return self.random_generator.random(no_of_values) < self.dirty_value_rate
+
+    def replace_with_dirty_values(self, raw_values, dirty_value_list):
+        """
+        Public: Method to replace a random selection of the values with values picked from the list of dirty values.
+        :param raw_values: A numpy array of objects containing the values.
+        :param dirty_value_list: A list containing the dirty values.
+        :return The numpy array containing the values, with the dirty values.
+        """
+        dirty_value_mask = self.get_dirty_value_mask(len(raw_values))
+        raw_values[dirty_value_mask] = self.random_generator.choice(dirty_value_list, dirty_value_mask.sum())
+        return raw_values
+
+    def get_misspelled_county_value(self, county_name):
+        """
+        Public: Method to get a misspelled or differently written version of a county name, as typed in by hand.
+        :param county_name: The county name.
+        :return The misspelled county name.
+        """
+        misspelling_no = self.random_generator.integers(6)
+        if misspelling_no == 0:
+            return "Co. " + county_name
+        if misspelling_no == 1:
+            return "County " + county_name
+        if misspelling_no == 2:
+            return county_name.lower()
+        if misspelling_no == 3:
+            return " " + county_name + " "
+        # Drop or double one of the letters
+        letter_no = self.random_generator.integers(len(county_name))
+        if misspelling_no == 4:
+            return county_name[:letter_no] + county_name[letter_no + 1:]
+        return county_name[:letter_no + 1] + county_name[letter_no:]
+
+    def generate_county_values(self, no_of_values):
+        """
+        Public: Method to generate the 'County' values: mostly county names (about half of the clients are from Dublin
+        and an eighth from Cork), with a share of town names, misspelled county names and places outside the ROI.
+        :param no_of_values: The number of values.
+        :return A numpy array of objects containing the 'County' values.
+        """
+        county_weights = np.array([0.46 if county_name == "Dublin" else 0.13 if county_name == "Cork" else 0.0
+                                   for county_name in self.county_name_list])
+        county_weights[county_weights == 0] = (1 - county_weights.sum()) / (county_weights == 0).sum()
+        county_values = self.random_generator.choice(self.county_name_list, no_of_values, p=county_weights)
+        county_values = county_values.astype(object)
+
+        dirty_value_nos = np.flatnonzero(self.get_dirty_value_mask(no_of_values))
+        for dirty_value_no in dirty_value_nos:
+            dirty_value_kind = self.random_generator.integers(3)
+            if dirty_value_kind == 0:
+                county_values[dirty_value_no] = self.random_generator.choice(self.town_name_list)
+            elif dirty_value_kind == 1:
+                county_values[dirty_value_no] = self.get_misspelled_county_value(county_values[dirty_value_no])
+            else:
+                county_values[dirty_value_no] = self.random_generator.choice(
+                    ["Spain", "Northern Ireland", "London", " ", "Dublin 4", "Sandyford"])
+        return county_values
+
+    def add_duplicate_rows(self, df_raw_data, generate_raw_data):
+        """
+        Public: Method to add rows with the Client ID of an earlier row (and other values), at the rate of
+        'dirty_value_rate'. The duplicate rows follow the rows they duplicate.
+        :param df_raw_data: A pandas dataframe object containing the raw data, ordered by Client ID.
+        :param generate_raw_data: The method generating the raw data for a numpy array of Client IDs.
+        :return A pandas dataframe object containing the raw data with the duplicate rows.
+        """
+        client_id_col = df_raw_data.columns[0]
+        duplicate_client_ids = df_raw_data[client_id_col].to_numpy()[self.get_dirty_value_mask(len(df_raw_data))]
+        df_raw_data = pd.concat([df_raw_data, generate_raw_data(duplicate_client_ids)], ignore_index=True)
+        return df_raw_data.sort_values(client_id_col, kind='mergesort', ignore_index=True)
+
+    def drop_client_rows(self, client_ids):
+        """
+        Public: Method to leave out a random selection of the clients (at the rate of 'dirty_value_rate'), which then
+        have no match when the files are joined.
+        :param client_ids: A numpy array containing the Client IDs.
+        :return A numpy array containing the Client IDs that are kept.
+        """
+        return client_ids[~self.get_dirty_value_mask(len(client_ids))]
+
+    def generate_demographic_data(self, client_ids):
+        """
+        Public: Method to generate the demographic data, with non-numeric ages, mixed gender codes, misspelled counties
+        and income groups with garbled separators.
+        :param client_ids: A numpy array containing the Client IDs.
+        :return A pandas dataframe object containing the raw demographic data.
+        """
+        no_of_clients = len(client_ids)
+        age_values = self.random_generator.integers(18, 71, no_of_clients).astype(str).astype(object)
+        age_values = self.replace_with_dirty_values(age_values, ["", "N/A", "unknown", "4O", "3 5", "-"])
+        gender_values = self.random_generator.choice(["0", "1"], no_of_clients).astype(object)
+        gender_values = self.replace_with_dirty_values(gender_values, ["M", "F", "m", "f", "Male", "Female", "fem"])
+        income_group_values = self.random_generator.choice(
+            ["0 - 10000", "10001 - 40000", "40001 - 60000", "60001 - 100000", "100000+"], no_of_clients,
+            p=[0.04, 0.56, 0.12, 0.17, 0.11]).astype(object)
+        income_group_values = self.replace_with_dirty_values(income_group_values,
+                                                             ["10001 ? 40000", "0  ? 10000", "10001 ?. 40000"])
+        return pd.DataFrame(dict(zip(self.raw_demographic_data_col_list,
+                                     [client_ids, age_values, gender_values,
+                                      self.generate_county_values(no_of_clients), income_group_values])))
+
+    def generate_previous_loan_data(self, client_ids):
+        """
+        Public: Method to generate the previous loan held data, with stray characters in place of some of the flags.
+        :param client_ids: A numpy array containing the Client IDs.
+        :return A pandas dataframe object containing the raw previous loan held data.
+        """
+        loan_held_values = self.random_generator.choice(["0", "1"], len(client_ids), p=[0.75, 0.25]).astype(object)
+        loan_held_values = self.replace_with_dirty_values(loan_held_values, ["\xb3", " \x80-   ", "Y"])
+        return pd.DataFrame(dict(zip(self.raw_prev_loan_data_col_list, [client_ids, loan_held_values])))
+
+    def generate_prods_held_data(self, client_ids):
+        """
+        Public: Method to generate the products held data, with negative and blank numbers of products.
+        :param client_ids: A numpy array containing the Client IDs.
+        :return A pandas dataframe object containing the raw products held data.
+        """
+        prods_held_values = self.random_generator.integers(1, 6, len(client_ids)).astype(str).astype(object)
+        prods_held_values = self.replace_with_dirty_values(prods_held_values, ["-1", "-2", " "])
+        return pd.DataFrame(dict(zip(self.raw_prods_held_data_col_list, [client_ids, prods_held_values])))
+
+    def generate_avg_txn_amt_data(self, client_ids):
+        """
+        Public: Method to generate the average transaction amounts, written as in the raw data with the euro sign (a
+        control character in ISO-8859-1) and thousands separators, with more control characters in some of them.
+        :param client_ids: A numpy array containing the Client IDs.
+        :return A pandas dataframe object containing the raw average transaction amount data.
+        """
+        avg_txn_amounts = np.round(self.random_generator.exponential(400, len(client_ids))).astype(np.int64)
+        avg_txn_amt_values = np.array(["\x80 {:,}".format(avg_txn_amount) for avg_txn_amount in avg_txn_amounts],
+                                      dtype=object)
+        for dirty_value_no in np.flatnonzero(self.get_dirty_value_mask(len(client_ids))):
+            avg_txn_amt_value = avg_txn_amt_values[dirty_value_no]
+            char_no = self.random_generator.integers(2, len(avg_txn_amt_value) + 1)
+            control_char = self.random_generator.choice(["\x7f", "\x1f", "\x9d", "\x0b", "\x81"])
+            avg_txn_amt_values[dirty_value_no] = "".join([avg_txn_amt_value[:char_no], control_char,
+                                                          avg_txn_amt_value[char_no:]])
+        return pd.DataFrame(dict(zip(self.raw_avg_txn_amt_data_col_list, [client_ids, avg_txn_amt_values])))
+
+    def generate_txn_details_data(self, client_ids):
+        """
+        Public: Method to generate the last transaction details. A third of the clients have no transactions (and no
+        last transaction), and some of the merchant codes are missing from the merchant categories.
+        :param client_ids: A numpy array containing the Client IDs.
+        :return A pandas dataframe object containing the raw transaction details data.
+        """
+        no_of_clients = len(client_ids)
+        no_of_txns = self.random_generator.integers(1, 100, no_of_clients)
+        no_of_txns[self.random_generator.random(no_of_clients) < 1 / 3] = 0
+        no_txn_mask = no_of_txns == 0
+        last_txn_amounts = np.round(self.random_generator.uniform(5, 900, no_of_clients), 2)
+        last_txn_amounts[no_txn_mask] = np.nan
+        merchant_codes = self.random_generator.choice(self.merchant_code_list, no_of_clients).astype(float)
+        merchant_codes[self.get_dirty_value_mask(no_of_clients)] = 9999
+        merchant_codes[no_txn_mask] = np.nan
+        last_txn_narratives = self.random_generator.choice(
+            ["THE BRIDGE LAUNDRY       WICKLOW TOWN", "LUXOR HOTEL/CASINO       LAS VEGAS    NV",
+             "TESCO STORES 3154        DUBLIN 15", "IRISH RAIL               DUBLIN 1",
+             "AMAZON MKTPLACE PMTS     AMZN.CO.UK/"], no_of_clients).astype(object)
+        last_txn_narratives[no_txn_mask] = np.nan
+        return pd.DataFrame(dict(zip(self.raw_txn_details_data_col_list,
+                                     [client_ids, no_of_txns, last_txn_amounts,
+                                      pd.array(merchant_codes, dtype="Int64"), last_txn_narratives])))
+
+    def generate_loan_flag_data(self, client_ids):
+        """
+        Public: Method to generate the loan flags (the target variable), about 2% of which are set.
+        :param client_ids: A numpy array containing the Client IDs.
+        :return A pandas dataframe object containing the raw loan flag data.
+        """
+        loan_flags = (self.random_generator.random(len(client_ids)) < 0.02).astype(np.int64)
+        return pd.DataFrame(dict(zip(self.raw_loan_flag_data_col_list, [client_ids, loan_flags])))
+
+    def generate_raw_data_chunk(self, client_ids, with_loan_flag):
+        """
+        Public: Method to generate the raw data of each file for a chunk of the clients, in the order of the raw data
+        file lists. Each supporting file leaves out a few of the clients, and every file has a few duplicate rows.
+        :param client_ids: A numpy array containing the Client IDs of the chunk.
+        :param with_loan_flag: A boolean flag indicating whether to generate the loan flag data.
+        :return A list containing the pandas dataframe objects holding the raw data of each file.
+        """
+        generate_raw_data_list = [self.generate_demographic_data, self.generate_previous_loan_data,
+                                  self.generate_prods_held_data, self.generate_avg_txn_amt_data,
+                                  self.generate_txn_details_data]
+        if with_loan_flag:
+            generate_raw_data_list.append(self.generate_loan_flag_data)
+
+        raw_data_frame_list = []
+        for file_no, generate_raw_data in enumerate(generate_raw_data_list):
+            file_client_ids = client_ids if file_no == 0 else self.drop_client_rows(client_ids)
+            raw_data_frame_list.append(self.add_duplicate_rows(generate_raw_data(file_client_ids), generate_raw_data))
+        return raw_data_frame_list
+
+    def write_raw_data_files(self, output_dir):
+        """
+        Public: Method to generate the training data for 'no_of_clients' clients and the testing data for a fifth as
+        many clients (the proportions of the shipped data), and write them into the raw data files under the output
+        directory. The data is generated and written in chunks of 'generation_chunk_size' clients, so the memory used
+        doesn't grow with the number of clients, and the same seed always generates the same files.
+        :param output_dir: Name of the directory to hold the raw data files.
+        :return A tuple containing the list of training data files and the list of testing data files.
+        """
+        self.random_generator = np.random.default_rng(self.random_seed)
+        raw_data_file_lists = self.get_raw_data_file_lists(output_dir)
+        no_of_clients_list = [self.no_of_clients, max(self.no_of_clients // 5, 1)]
+        for raw_data_file_list, no_of_clients in zip(raw_data_file_lists, no_of_clients_list):
+            raw_data_file_list = [raw_data_file for raw_data_file in raw_data_file_list if raw_data_file]
+            for raw_data_file in raw_data_file_list:
+                os.makedirs(os.path.dirname(raw_data_file), exist_ok=True)
+            for chunk_start in range(0, no_of_clients, self.generation_chunk_size):
+                chunk_stop = min(chunk_start + self.generation_chunk_size, no_of_clients)
+                client_ids = np.arange(chunk_start + 1, chunk_stop + 1)
+                raw_data_frame_list = self.generate_raw_data_chunk(client_ids, len(raw_data_file_list) == 6)
+                for df_raw_data, raw_data_file in zip(raw_data_frame_list, raw_data_file_list):
+                    df_raw_data.to_csv(raw_data_file, index=False, encoding=self.encoding_format,
+                                       header=chunk_start == 0, mode='w' if chunk_start == 0 else 'a')
+        return raw_data_file_lists
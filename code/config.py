@@ -9,16 +9,127 @@ PROCESSED_TRAIN_DATA_DIR = PROCESSED_DATA_DIR + "train/"
 PROCESSED_TEST_DATA_DIR = PROCESSED_DATA_DIR + "test/"
 PRO_TRA_DATA_FILE_NAME = PROCESSED_TRAIN_DATA_DIR + "Processed_Training_Data.csv"
 PRO_TEST_DATA_FILE_NAME = PROCESSED_TEST_DATA_DIR + "Processed_Testing_Data.csv"
+# Formats of the processed data files: "csv" and/or the typed columnar formats "parquet" and "feather" (written next
+# to the CSV file, with the format as the extension)
+PROCESSED_DATA_FORMATS = ["csv"]
 
 EXTERNAL_DATA_DIR = "../data/external/"
 EXT_COUNTY_TOWN_DATA_FILE = EXTERNAL_DATA_DIR + "Towns And Counties.csv"
 EXT_MERCHANT_CATEGORY_DATA_FILE = EXTERNAL_DATA_DIR + "MerchantCode_Category.csv"
 
+CACHE_DATA_DIR = "../data/cache/"
+REPORT_DATA_DIR = "../data/reports/"
+BENCHMARK_DATA_DIR = "../data/benchmark/"
+
 PREDICTED_DATA_DIR = "../data/predicted/"
 PRE_LOAN_LIKELIHOOD_FILE = PREDICTED_DATA_DIR + "Predicted_Loan_Likelihoods.csv"
 
+MODEL_DIR = "../models/"
+LOAN_LIKELIHOOD_MODEL_FILE = MODEL_DIR + "Loan_Likelihood_Pipeline.joblib"
+
+# Model training (LoanUptakeRatePredictionTrainer): the processed data file the model is trained on, the share of it
+# held out for validation, the number of cross-validation folds, the grid of classifier parameters searched, the number
+# of trees of the feature selection forest, the random seed (resampling, splitting, the forest and the classifier) and
+# the number of worker processes running the folds and candidates (-1 uses every core)
+TRAINING_DATA_FILE_NAME = PRO_TRA_DATA_FILE_NAME
+TRAINING_VALIDATION_SIZE = 0.3
+TRAINING_CV_FOLDS = 10
+TRAINING_PARAMETER_GRID = {'classifier__penalty': ['l1', 'l2'],
+                           'classifier__C': [0.01, 0.1, 1],
+                           'classifier__solver': ['liblinear']}
+TRAINING_FEATURE_SELECTION_TREES = 200
+TRAINING_RANDOM_SEED = 123
+TRAINING_WORKERS = -1
+
+# Processed data file scored by LoanUptakeRatePredictionScorer (CSV, parquet or feather), and the number of rows scored
+# at a time
+SCORING_DATA_FILE_NAME = PRO_TEST_DATA_FILE_NAME
+SCORING_BATCH_SIZE = 100000
+
+# Online scoring service: requests arriving within SERVICE_MAX_BATCH_WAIT_MS of each other are scored together, up to
+# SERVICE_MAX_BATCH_SIZE records per batch; the latency percentiles cover the last SERVICE_LATENCY_WINDOW requests.
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8080
+SERVICE_MAX_BATCH_SIZE = 64
+SERVICE_MAX_BATCH_WAIT_MS = 1
+# Batches of up to SERVICE_RECORD_PATH_MAX_RECORDS records are scored one record at a time from the cleaned values,
+# which is faster than building dataframes for a few records; larger batches are scored with vectorized calls.
+SERVICE_RECORD_PATH_MAX_RECORDS = 64
+SERVICE_LATENCY_WINDOW = 10000
+
+# Benchmark suite: the synthetic raw data files for each number of clients are generated (once, in chunks of
+# BENCHMARK_GENERATION_CHUNK_SIZE clients) under BENCHMARK_DATA_DIR, with BENCHMARK_DIRTY_VALUE_RATE of each kind of
+# dirty value. A stage is reported as a regression when it takes more than BENCHMARK_REGRESSION_TOLERANCE longer (and
+# BENCHMARK_MIN_REGRESSION_SECONDS more) or uses that much more memory than in the stored baseline. The wall time of
+# each stage is the median over BENCHMARK_WALL_TIME_REPEATS runs of the pipeline.
+BENCHMARK_CLIENT_COUNTS = [10000, 1000000, 10000000]
+BENCHMARK_RANDOM_SEED = 123
+BENCHMARK_DIRTY_VALUE_RATE = 0.001
+BENCHMARK_GENERATION_CHUNK_SIZE = 1000000
+BENCHMARK_RESULTS_FILE = BENCHMARK_DATA_DIR + "Benchmark_Results.json"
+BENCHMARK_BASELINE_FILE = BENCHMARK_DATA_DIR + "Benchmark_Baseline.json"
+BENCHMARK_REGRESSION_TOLERANCE = 0.25
+BENCHMARK_MIN_REGRESSION_SECONDS = 0.05
+BENCHMARK_WALL_TIME_REPEATS = 5
+BENCHMARK_UPDATE_BASELINE = False
+
 ENCODING_FORMAT = "ISO-8859-1"
 
+# Maximum number of distinct raw 'County' values memoized by the county resolver
+COUNTY_RESOLVER_CACHE_SIZE = 100000
+
+# Number of rows loaded, merged and cleaned at a time (None processes each data set fully in memory). Every raw data
+# file is read in chunks of this many rows and spilled under STREAMING_SPILL_DIR, in partitions on 'ClientID' of about
+# this many clients each. Each partition is merged and cleaned on its own, and the cleaned rows are written in the
+# order of the demographic data file. The spill files take about as much disk space as the data and are removed after.
+STREAMING_CHUNK_SIZE = None
+STREAMING_SPILL_DIR = CACHE_DATA_DIR + "spill/"
+
+# Number of workers loading the raw data files concurrently (None loads the files one after another), and the type of
+# the worker pool ("thread" or "process")
+INGESTION_WORKERS = None
+INGESTION_POOL_TYPE = "thread"
+
+# Number of worker processes cleaning the merged data in parallel (None cleans it on one core). The rows are
+# hash-partitioned on 'ClientID' into one shard per worker and the cleaned shards are joined back in the original row
+# order. Data sets smaller than the minimum number of rows are cleaned on one core, as sending them to the workers
+# would cost more than it saves.
+CLEANING_WORKERS = None
+CLEANING_SHARD_MIN_ROWS = 100000
+
+# Join the data on the sorted 'ClientID' keys, when every data source is already ordered by 'ClientID'
+SORTED_JOIN_FAST_PATH = True
+
+# Keep the category columns as pandas categoricals (with fixed category sets) and downcast the integer columns to the
+# smallest integer type that fits, printing the memory used by each column before and after
+COMPACT_DTYPES = False
+# With COMPACT_DTYPES, the text columns with few distinct values are read as pandas categoricals and cleaned through
+# their categories, so that they are never expanded into a string per row
+COMPACT_RAW_CATEGORY_COL_LIST = ['Age', 'Gender', 'IncomeGroup', 'County', 'LoanHeldBefore', 'NoOfProductsHeld']
+
+# Cache the result of each stage (load, merge and each cleaning step) on disk, keyed on the content of the input and
+# external data files and the relevant config values. The least recently used results are evicted once the cache grows
+# beyond the maximum size, and a rebuild of every stage can be forced.
+STAGE_CACHE_ENABLED = False
+STAGE_CACHE_DIR = CACHE_DATA_DIR + "stages/"
+STAGE_CACHE_MAX_SIZE_BYTES = 2 * 1024 ** 3
+STAGE_CACHE_FORCE_REBUILD = False
+
+# Process only the clients inserted or updated since the last run (told apart by the fingerprints of their raw rows)
+# and upsert them into the delta store of each data set, which keeps the processed rows of every client for the next
+# run. The store is rebuilt in full when the config values, the processing code or the reference data change.
+DELTA_PROCESSING_ENABLED = False
+DELTA_STORE_DIR = CACHE_DATA_DIR + "delta/"
+DELTA_TRAINING_STORE_FILE = DELTA_STORE_DIR + "Training_Processed_Store.pkl"
+DELTA_TESTING_STORE_FILE = DELTA_STORE_DIR + "Testing_Processed_Store.pkl"
+
+# Record the elapsed time, rows in & out, throughput and peak memory growth of each stage (loading, merging, each
+# cleaning step and writing) into a JSON run report, and optionally run one named stage (e.g. "clean_county_values")
+# under cProfile, writing its profile next to the report
+RUN_REPORT_ENABLED = False
+RUN_REPORT_FILE = REPORT_DATA_DIR + "Processing_Run_Report.json"
+RUN_REPORT_PROFILED_STAGE = None
+
 # Config Variables for Raw Data
 RAW_TRA_DEMOGRAPHIC_DATA_FILE = RAW_TRAIN_DATA_DIR + "Model Build - Demographics.csv"
 RAW_TRA_PREVIOUS_LOAN_DATA_FILE = RAW_TRAIN_DATA_DIR + "Model Build - Previous Loan Holdings.csv"
@@ -39,6 +150,34 @@ RAW_TEST_DATA_FILE_LIST = [RAW_TEST_DEMOGRAPHIC_DATA_FILE, RAW_TEST_PREVIOUS_LOA
                            RAW_TEST_PRODUCTS_HELD_DATA_FILE, RAW_TEST_AVG_TXN_AMOUNT_DATA_FILE,
                            RAW_TEST_TXN_DETAILS_DATA_FILE]
 
+# Columns of the raw data files, renamed during the first level of pre-processing
+RAW_DEMOGRAPHIC_DATA_COL_DICT = {"Client ID": "ClientID",
+                                 "Age": "Age",
+                                 "Gender \n1: Female, 2: Male": "Gender",
+                                 "County": "County",
+                                 "Income Group": "IncomeGroup"}
+RAW_PREVIOUS_LOAN_DATA_COL_DICT = {"Client ID": "ClientID",
+                                   "Held Loan previously": "LoanHeldBefore"}
+RAW_PRODUCTS_HELD_DATA_COL_DICT = {"Client ID": "ClientID",
+                                   "# Products in bank": "NoOfProductsHeld"}
+RAW_AVG_TXN_AMOUNT_DATA_COL_DICT = {"Client ID": "ClientID",
+                                    "Average amount of CA transaction": "AvgTxnAmt"}
+RAW_TXN_DETAILS_DATA_COL_DICT = {"Client": "ClientID",
+                                 "Num Transactions": "NoOfTxns",
+                                 "Last TXN Amount": "LastTxnAmt",
+                                 "Merchant Code": "MerCode",
+                                 "Last Transaction Narrative": "LastTxnNrtv"}
+RAW_TARGET_VARIABLE_DATA_COL_DICT = {"Client ID": "ClientID",
+                                     "Loan Flag": "LoanFlag"}
+# Types the raw columns are read with, whatever values the file (or the chunk of it being streamed) holds. The columns
+# cleaned as text are read as strings, so that e.g. a blank 'Age' doesn't turn every age into a float ('36.0'), and
+# the numeric columns as nullable integers or floats; only the types of the Client IDs are inferred.
+RAW_DATA_COL_DTYPE_DICT = {"Age": str, "Gender \n1: Female, 2: Male": str, "County": str, "Income Group": str,
+                           "Held Loan previously": str, "# Products in bank": str,
+                           "Average amount of CA transaction": str, "Num Transactions": "Int64",
+                           "Last TXN Amount": float, "Merchant Code": "Int64", "Last Transaction Narrative": str,
+                           "Loan Flag": "Int64"}
+
 INTEGER_VAR_COL_LIST = ['Age', 'NoOfProductsHeld', 'NoOfTxns']
 FLOAT_VAR_COL_LIST = ['LastTxnAmt', 'AvgTxnAmt']
 CATEGORY_VAR_COL_LIST = ['Gender', 'County', 'LoanHeldBefore', 'MerCategory', 'IncomeCategory']
@@ -0,0 +1,58 @@
+# Import the required libraries
+import os
+import sys
+import pandas as pd
+import pytest
+
+CODE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code")
+sys.path.insert(0, CODE_DIR)
+
+from LoanUptakeRatePredictionDataProcessor import LoanUptakeRatePredictionDataProcessor
+import config as cfg
+
+# Number of demographic rows copied from the raw training data into the raw data files of a test
+NO_OF_TEST_CLIENTS = 300
+
+
+@pytest.fixture(autouse=True)
+def code_dir(monkeypatch):
+    # The paths in the config file are relative to the code directory.
+    monkeypatch.chdir(CODE_DIR)
+
+
+@pytest.fixture
+def data_processor():
+    data_processor = LoanUptakeRatePredictionDataProcessor()
+    data_processor.print_reports = False
+    return data_processor
+
+
+@pytest.fixture
+def write_raw_data_files(tmp_path, code_dir):
+    """
+    Returns a function writing the raw training data files of the first NO_OF_TEST_CLIENTS clients into the temporary
+    directory, after passing each of them (as a pandas dataframe of the raw text values) through the given function.
+    """
+    def write_raw_data_files(edit_raw_data=None):
+        raw_data_file_list = []
+        client_ids = None
+        for file_no, raw_data_file in enumerate(cfg.RAW_TRAINING_DATA_FILE_LIST):
+            df_raw_data = pd.read_csv(raw_data_file, encoding=cfg.ENCODING_FORMAT, dtype=str, keep_default_na=False)
+            if client_ids is None:
+                client_ids = df_raw_data[df_raw_data.columns[0]].iloc[:NO_OF_TEST_CLIENTS]
+            df_raw_data = df_raw_data[df_raw_data[df_raw_data.columns[0]].isin(client_ids)].reset_index(drop=True)
+            if edit_raw_data is not None:
+                df_raw_data = edit_raw_data(file_no, df_raw_data)
+            test_data_file = str(tmp_path / os.path.basename(raw_data_file))
+            df_raw_data.to_csv(test_data_file, index=False, encoding=cfg.ENCODING_FORMAT)
+            raw_data_file_list.append(test_data_file)
+        return raw_data_file_list
+    return write_raw_data_files
+
+
+def process_in_memory(data_processor, raw_data_file_list):
+    """
+    Loads, merges and cleans the raw data files in memory.
+    """
+    return data_processor.process_input_data(data_processor.combine_all_dataframes(
+        data_processor.prepare_combined_data_frame_list(raw_data_file_list)))
@@ -0,0 +1,39 @@
+# Import the required libraries
+import pandas as pd
+from conftest import process_in_memory
+
+DEMOGRAPHIC_FILE_NO = 0
+MISSING_AGE_ROW_NO = 3
+
+
+def blank_one_age(file_no, df_raw_data):
+    if file_no == DEMOGRAPHIC_FILE_NO:
+        df_raw_data.loc[MISSING_AGE_ROW_NO, 'Age'] = ""
+    return df_raw_data
+
+
+def write_ages_as_floats(file_no, df_raw_data):
+    # As the ages are exported from a float column (a column with a missing value), e.g. '36.0'.
+    df_raw_data = blank_one_age(file_no, df_raw_data)
+    if file_no == DEMOGRAPHIC_FILE_NO:
+        df_raw_data['Age'] = pd.to_numeric(df_raw_data['Age'], errors='coerce').astype(float).astype(str) \
+            .replace('nan', "")
+    return df_raw_data
+
+
+def test_one_missing_age_leaves_the_other_ages_intact(data_processor, write_raw_data_files):
+    df_loan_data = process_in_memory(data_processor, write_raw_data_files())
+    df_missing_age_data = process_in_memory(data_processor, write_raw_data_files(blank_one_age))
+    df_float_age_data = process_in_memory(data_processor, write_raw_data_files(write_ages_as_floats))
+
+    missing_age_mask = df_missing_age_data['Age'].isna()
+    assert missing_age_mask.sum() == 1
+    assert (df_missing_age_data['Age'][~missing_age_mask] == df_loan_data['Age'][~missing_age_mask]).all()
+    assert df_float_age_data['Age'].equals(df_missing_age_data['Age'])
+
+
+def test_clean_raw_record_keeps_a_whole_number_age_written_as_a_float(data_processor):
+    raw_record = {'Client ID': 1, 'Income Group': "10001-40000"}
+    assert data_processor.clean_raw_record(dict(raw_record, Age=36.0))['Age'] == 36
+    assert data_processor.clean_raw_record(dict(raw_record, Age="36.0"))['Age'] == 36
+    assert pd.isna(data_processor.clean_raw_record(dict(raw_record, Age="36.5"))['Age'])
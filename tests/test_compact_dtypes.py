@@ -0,0 +1,28 @@
+# Import the required libraries
+from pandas.api.types import CategoricalDtype
+from conftest import process_in_memory
+
+
+def blank_some_category_values(file_no, df_raw_data):
+    if file_no == 0:
+        df_raw_data.loc[10, 'Age'] = ""
+        df_raw_data.loc[11, 'Gender \n1: Female, 2: Male'] = ""
+        df_raw_data.loc[12, 'County'] = ""
+    elif file_no == 1:
+        df_raw_data.loc[13, 'Held Loan previously'] = ""
+    elif file_no == 2:
+        df_raw_data.loc[14, '# Products in bank'] = ""
+    return df_raw_data
+
+
+def test_compact_dtypes_clean_the_categorical_columns_to_the_same_values(data_processor, write_raw_data_files):
+    raw_data_file_list = write_raw_data_files(blank_some_category_values)
+    df_loan_data = process_in_memory(data_processor, raw_data_file_list)
+
+    data_processor.compact_dtypes = True
+    data_frame_list = data_processor.prepare_combined_data_frame_list(raw_data_file_list)
+    df_compact_loan_data = process_in_memory(data_processor, raw_data_file_list)
+
+    assert isinstance(data_frame_list[0]['County'].dtype, CategoricalDtype)
+    assert isinstance(df_compact_loan_data['County'].dtype, CategoricalDtype)
+    assert df_compact_loan_data.to_csv(index=False) == df_loan_data.to_csv(index=False)
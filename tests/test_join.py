@@ -0,0 +1,43 @@
+# Import the required libraries
+from conftest import process_in_memory
+
+PRODUCTS_HELD_FILE_NO = 2
+
+
+def blank_one_client_id(file_no, df_raw_data):
+    if file_no == PRODUCTS_HELD_FILE_NO:
+        df_raw_data.loc[5, 'Client ID'] = ""
+    return df_raw_data
+
+
+def drop_one_row(file_no, df_raw_data):
+    if file_no == PRODUCTS_HELD_FILE_NO:
+        df_raw_data = df_raw_data.drop(index=5)
+    return df_raw_data
+
+
+def test_blank_client_id_in_supporting_file_drops_only_its_row(data_processor, write_raw_data_files, tmp_path):
+    df_blank_id_data = process_in_memory(data_processor, write_raw_data_files(blank_one_client_id))
+    df_dropped_row_data = process_in_memory(data_processor, write_raw_data_files(drop_one_row))
+
+    assert df_blank_id_data['ClientID'].dtype == df_dropped_row_data['ClientID'].dtype == 'int64'
+    assert df_blank_id_data.to_csv(index=False) == df_dropped_row_data.to_csv(index=False)
+
+
+def test_join_drop_report_is_keyed_by_file_and_summed_across_streamed_partitions(data_processor, write_raw_data_files,
+                                                                                 tmp_path):
+    raw_data_file_list = write_raw_data_files(drop_one_row)
+    data_processor.raw_training_data_file_list = raw_data_file_list
+    df_training_data = data_processor.load_training_data()
+    in_memory_join_drop_report = data_processor.join_drop_report
+
+    data_processor.join_drop_report = {}
+    data_processor.streaming_chunk_size = 50
+    data_processor.stream_process_data(raw_data_file_list, str(tmp_path / "Streamed_Data.csv"))
+
+    assert list(in_memory_join_drop_report) == raw_data_file_list
+    assert all(source_report["JoinedRows"] == len(df_training_data)
+               for source_report in in_memory_join_drop_report.values())
+    # The client whose products held row was removed is dropped from the demographic data.
+    assert in_memory_join_drop_report[raw_data_file_list[0]]["DroppedRows"] >= 1
+    assert data_processor.join_drop_report == in_memory_join_drop_report
@@ -0,0 +1,36 @@
+# Import the required libraries
+import io
+import pandas as pd
+import config as cfg
+from conftest import process_in_memory
+
+
+def get_raw_records(raw_data_file_list):
+    """
+    Joins the raw values of each client across the raw data files (other than the loan flag one) into a raw record,
+    with the empty values as None (as in a JSON request).
+    """
+    raw_record_dict = {}
+    for raw_data_file in raw_data_file_list[:5]:
+        df_raw_data = pd.read_csv(raw_data_file, encoding=cfg.ENCODING_FORMAT, dtype=str, keep_default_na=False)
+        for raw_record in df_raw_data.to_dict('records'):
+            client_id = int(raw_record[df_raw_data.columns[0]])
+            for raw_col, raw_value in raw_record.items():
+                raw_record_dict.setdefault(client_id, {}).setdefault(raw_col, None if raw_value == "" else raw_value)
+    return raw_record_dict
+
+
+def test_clean_raw_record_matches_the_cleaned_data_frame(data_processor, write_raw_data_files):
+    raw_data_file_list = write_raw_data_files()
+    # The cleaned values are compared with the processed data as the batch scorer reads it back.
+    df_loan_data = pd.read_csv(io.StringIO(process_in_memory(data_processor, raw_data_file_list).to_csv(index=False)))
+    raw_record_dict = get_raw_records(raw_data_file_list)
+
+    for processed_record in df_loan_data.drop(columns='LoanFlag').to_dict('records'):
+        cleaned_record = data_processor.clean_raw_record(raw_record_dict[processed_record['ClientID']])
+        assert list(cleaned_record) == list(processed_record)
+        # The Client ID is passed through as given in the record.
+        assert cleaned_record.pop('ClientID') == str(processed_record.pop('ClientID'))
+        for col, processed_value in processed_record.items():
+            assert (pd.isna(cleaned_record[col]) and pd.isna(processed_value)) or \
+                cleaned_record[col] == processed_value, (cleaned_record, col)
@@ -0,0 +1,32 @@
+# Import the required libraries
+from StageResultCache import StageResultCache
+
+LOAN_FLAG_FILE_NO = 5
+
+
+def test_stage_cache_key_changes_with_the_column_renames(data_processor, write_raw_data_files, tmp_path):
+    raw_data_file_list = write_raw_data_files()
+    data_processor.stage_result_cache = StageResultCache(str(tmp_path / "stage_cache") + "/", 10 ** 9)
+    df_loan_data = data_processor.process_data_with_stage_cache(raw_data_file_list)
+
+    data_processor.raw_loan_flag_data_col_dict = {"Client ID": "ClientID", "Loan Flag": "Target"}
+    data_processor.raw_data_col_dict_list[LOAN_FLAG_FILE_NO] = data_processor.raw_loan_flag_data_col_dict
+    df_renamed_data = data_processor.process_data_with_stage_cache(raw_data_file_list)
+
+    assert 'LoanFlag' in df_loan_data.columns
+    assert 'Target' in df_renamed_data.columns and 'LoanFlag' not in df_renamed_data.columns
+
+
+def test_delta_store_is_rebuilt_when_the_column_renames_change(data_processor, write_raw_data_files, tmp_path):
+    raw_data_file_list = write_raw_data_files()
+    delta_store_file = str(tmp_path / "delta" / "Delta_Store.pkl")
+    data_processor.process_data_incrementally(raw_data_file_list, delta_store_file)
+    data_processor.process_data_incrementally(raw_data_file_list, delta_store_file)
+    assert data_processor.delta_change_report["Inserted"] == 0
+
+    data_processor.raw_loan_flag_data_col_dict = {"Client ID": "ClientID", "Loan Flag": "Target"}
+    data_processor.raw_data_col_dict_list[LOAN_FLAG_FILE_NO] = data_processor.raw_loan_flag_data_col_dict
+    df_renamed_data = data_processor.process_data_incrementally(raw_data_file_list, delta_store_file)
+
+    assert data_processor.delta_change_report["Unchanged"] == 0
+    assert 'Target' in df_renamed_data.columns and 'LoanFlag' not in df_renamed_data.columns
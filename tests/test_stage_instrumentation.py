@@ -0,0 +1,36 @@
+# Import the required libraries
+import numpy as np
+from StageInstrumentation import StageInstrumentation
+
+MIB = 1024 ** 2
+
+
+def allocate_memory(no_of_bytes):
+    allocated_array = np.ones(no_of_bytes // 8)
+    return int(allocated_array[-1])
+
+
+def run_nested_stage(stage_instrumentation):
+    allocated_array = np.ones(64 * MIB // 8)
+    stage_instrumentation.run_stage('allocate_16_mib', allocate_memory, 16 * MIB)
+    return int(allocated_array[-1])
+
+
+def get_stage_peak_memory(run_report, stage_name):
+    return next(stage_record["PeakMemoryBytes"] for stage_record in run_report["Stages"]
+                if stage_record["Stage"] == stage_name)
+
+
+def test_stage_peak_memory_is_measured_below_an_earlier_peak():
+    stage_instrumentation = StageInstrumentation()
+    stage_instrumentation.start_run()
+    stage_instrumentation.run_stage('allocate_256_mib', allocate_memory, 256 * MIB)
+    stage_instrumentation.run_stage('allocate_32_mib', allocate_memory, 32 * MIB)
+    stage_instrumentation.run_stage('run_nested_stage', run_nested_stage, stage_instrumentation)
+    run_report = stage_instrumentation.get_run_report()
+
+    assert 200 * MIB < get_stage_peak_memory(run_report, 'allocate_256_mib') < 300 * MIB
+    assert 24 * MIB < get_stage_peak_memory(run_report, 'allocate_32_mib') < 64 * MIB
+    # The memory the outer stage allocated before the nested stage ran is part of its peak.
+    assert 72 * MIB < get_stage_peak_memory(run_report, 'run_nested_stage') < 128 * MIB
+    assert run_report["PeakMemoryBytes"] > 256 * MIB
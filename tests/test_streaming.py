@@ -0,0 +1,25 @@
+# Import the required libraries
+from conftest import process_in_memory
+
+
+def blank_some_values(file_no, df_raw_data):
+    if file_no == 0:
+        df_raw_data.loc[10, 'Age'] = ""
+    elif file_no == 4:
+        df_raw_data.loc[20, 'Num Transactions'] = ""
+    elif file_no == 5:
+        df_raw_data.loc[30, 'Loan Flag'] = ""
+    return df_raw_data
+
+
+def test_streamed_data_matches_in_memory_data_with_blank_values(data_processor, write_raw_data_files, tmp_path):
+    raw_data_file_list = write_raw_data_files(blank_some_values)
+    in_memory_data_file = str(tmp_path / "In_Memory_Data.csv")
+    streamed_data_file = str(tmp_path / "Streamed_Data.csv")
+
+    process_in_memory(data_processor, raw_data_file_list).to_csv(in_memory_data_file, index=False)
+    data_processor.streaming_chunk_size = 50
+    data_processor.stream_process_data(raw_data_file_list, streamed_data_file)
+
+    with open(in_memory_data_file) as in_memory_data, open(streamed_data_file) as streamed_data:
+        assert streamed_data.read() == in_memory_data.read()